@@ -0,0 +1,83 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libraries.exporter import ChatExporter  # noqa: E402
+from libraries.history import HistorySpool  # noqa: E402
+from libraries.models import SlackMessage  # noqa: E402
+
+sample_fragments = [
+    "plain words go here", "*bold text*", "_italic text_", "~struck~", "`inline code`",
+    "<@U0>", "<#C0123ABCD|general>", "<https://example.com/path?a=1&amp;b=2|a link>", "<!here>",
+    "&amp; &lt;tag&gt;", "```def main():\n    return 1```", "\n&gt; quoted line\n", "\n",
+]
+
+plain_words = ["the", "deploy", "finished", "can", "you", "review", "this", "before", "lunch", "thanks", "I", "think",
+               "we", "should", "ship", "it", "today", "ok", "sounds", "good"]
+
+
+def build_spool(message_count: int, seed: int = 1):
+    rnd = random.Random(seed)
+    spool = HistorySpool()
+    page = []
+    for message_index in range(message_count):
+        text = " ".join(rnd.choice(sample_fragments) if rnd.random() < 0.3 else rnd.choice(plain_words)
+                        for _ in range(rnd.randint(3, 60)))
+        page.append(SlackMessage.from_dict({
+            "ts": f"{1600000000 + message_index * 60:.6f}",
+            "user": f"U{message_index % 5}",
+            "text": text
+        }))
+        if len(page) == 1000:
+            spool.add_page(page)
+            page = []
+    if page:
+        spool.add_page(page)
+    return spool
+
+
+def time_format(output_format: str, chat_messages: HistorySpool, output_path: str):
+    # the users are known up front so the run never reaches slack
+    users = {f"U{user_index}": {"name": f"user{user_index}", "real_name": f"User {user_index}"}
+             for user_index in range(5)}
+    exporter = ChatExporter(token="", users=users, search_index=False, output_format=output_format)
+    html_result = {"media": [], "current_message_progress": 0, "search_index": None, "stats": None}
+    render = exporter.convert_chat_to_html if output_format == "html" else exporter.convert_chat_to_text
+    start = time.perf_counter()
+    with open(output_path, "w", encoding="utf-8") as f:
+        for chunk in render(
+            chat_id="C0",
+            chat_name="general",
+            chat_type="Channel",
+            chat_messages=chat_messages,
+            chat_progress_unit=100,
+            current_chat_progress=0,
+            html_result=html_result
+        ):
+            f.write(chunk)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the html, markdown and plain text chat renderers.")
+    parser.add_argument("--messages", type=int, default=100000)
+    args = parser.parse_args()
+    chat_messages = build_spool(args.messages)
+    print(f"{args.messages} messages")
+    with tempfile.TemporaryDirectory() as folder_path:
+        for output_format in ("html", "markdown", "text"):
+            output_path = f"{folder_path}/chat.{output_format}"
+            elapsed = time_format(output_format=output_format, chat_messages=chat_messages, output_path=output_path)
+            output_size = os.path.getsize(output_path)
+            print(f"{output_format:<10} {elapsed:7.2f}s {args.messages / elapsed:10.0f} messages/s "
+                  f"{output_size / 1024 / 1024:8.1f} MB written")
+    chat_messages.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libraries.mrkdwn import MrkdwnRenderer  # noqa: E402
+
+sample_fragments = [
+    "plain words go here", "*bold text*", "_italic text_", "~struck~", "`inline code`",
+    "<@U0123ABCD>", "<#C0123ABCD|general>", "<https://example.com/path?a=1&amp;b=2|a link>", "<!here>",
+    "&amp; &lt;tag&gt;", "```def main():\n    return 1```", "\n&gt; quoted line\n", "\n",
+]
+
+plain_words = ["the", "deploy", "finished", "can", "you", "review", "this", "before", "lunch", "thanks", "I", "think",
+               "we", "should", "ship", "it", "today", "ok", "sounds", "good"]
+
+
+def legacy_render(text: str):
+    # the chained str.replace renderer this module replaced, kept for comparison. it only escapes < and > and splits
+    # code blocks, so it is a floor for the cost of reading the text rather than the same work: it leaves mrkdwn,
+    # mentions, links and entities unrendered
+    text = text.replace("<", "&lt;").replace(">", "&gt;")
+    if "```" in text:
+        blocks = text.split("```")
+        text_html = ""
+        for i, block in enumerate(blocks):
+            if i % 2 == 0:
+                text_html += f"<p><bdi>{block}</bdi></p>"
+            else:
+                text_html += f'<div class="code-block"><pre>{block}</pre></div>'
+        return text_html
+    return f"<p><bdi>{text}</bdi></p>"
+
+
+def build_corpus(message_count: int, markup_rate: float = 0.3, seed: int = 1):
+    rnd = random.Random(seed)
+    return [
+        " ".join(rnd.choice(sample_fragments) if rnd.random() < markup_rate else rnd.choice(plain_words)
+                 for _ in range(rnd.randint(3, 60)))
+        for _ in range(message_count)
+    ]
+
+
+def time_renderer(render, corpus: list):
+    start = time.perf_counter()
+    for text in corpus:
+        render(text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the mrkdwn renderer with the legacy str.replace renderer.")
+    parser.add_argument("--messages", type=int, default=100000)
+    args = parser.parse_args()
+    renderer = MrkdwnRenderer(resolve_user=lambda user_id: "Some User")
+    # the tokenizer pays per token in python, so its speed depends on how much markup a chat has, a third of the
+    # words being markup is far above most real chats and shows the worst case next to mostly plain prose
+    for corpus_name, markup_rate in (("markup heavy", 0.3), ("mostly prose", 0.03)):
+        corpus = build_corpus(args.messages, markup_rate=markup_rate)
+        corpus_size = sum(len(text) for text in corpus)
+        print(f"{corpus_name}: {args.messages} messages, {corpus_size / 1024 / 1024:.1f} MB of text")
+        for name, render in [("legacy str.replace", legacy_render), ("mrkdwn tokenizer", renderer.render)]:
+            elapsed = time_renderer(render, corpus)
+            print(f"{name:<20} {elapsed:7.2f}s {args.messages / elapsed:10.0f} messages/s "
+                  f"{corpus_size / elapsed / 1024 / 1024:6.1f} MB/s")
+    # a single huge message should scale linearly with its length
+    for repeat in (1000, 10000, 100000):
+        text = " ".join(sample_fragments) * repeat
+        elapsed = time_renderer(renderer.render, [text])
+        print(f"single message {len(text) / 1024 / 1024:6.1f} MB {elapsed:7.3f}s")
+
+
+if __name__ == '__main__':
+    main()
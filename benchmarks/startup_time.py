@@ -0,0 +1,61 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+repo_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# command, modules that must not be imported by it
+startup_checks = {
+    "export.py --help": ([sys.executable, "-X", "importtime", "export.py", "--help"],
+                         ["PyQt5", "requests", "humanize", "slack_sdk"]),
+    "import libraries.exporter": ([sys.executable, "-X", "importtime", "-c", "import libraries.exporter"],
+                                  ["PyQt5", "requests", "humanize"]),
+}
+
+
+def run(command: list):
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=repo_path, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed: {result.stderr[-2000:]}")
+    imported_modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            imported_modules.add(line.rsplit("|", 1)[1].strip().split(".")[0])
+    return elapsed, imported_modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the headless export path starts fast.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=150,
+                        help="allowed startup time on top of a bare interpreter start")
+    args = parser.parse_args()
+    baseline = statistics.median(run([sys.executable, "-c", "pass"])[0] for _ in range(args.runs))
+    print(f"{'python -c pass':<28} {baseline:8.1f} ms")
+    failed = False
+    for name, (command, forbidden_modules) in startup_checks.items():
+        timings = []
+        imported_modules = set()
+        for _ in range(args.runs):
+            elapsed, imported_modules = run(command)
+            timings.append(elapsed)
+        overhead = statistics.median(timings) - baseline
+        leaked_modules = sorted(imported_modules.intersection(forbidden_modules))
+        status = "ok"
+        if leaked_modules:
+            status = f"imports {', '.join(leaked_modules)}"
+            failed = True
+        elif overhead > args.budget_ms:
+            status = f"over the {args.budget_ms:.0f} ms budget"
+            failed = True
+        print(f"{name:<28} {statistics.median(timings):8.1f} ms (+{overhead:.1f} ms) {status}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,294 @@
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+
+from libraries.media import default_segment_threshold
+
+logger = logging.getLogger(__name__)
+
+chat_types = {"channel": "Channel", "group": "Group Chat", "dm": "Direct Message"}
+
+
+def parse_time_bound(value: str):
+    # accepts a unix timestamp or a local YYYY-MM-DD date
+    try:
+        return f"{float(value):.6f}"
+    except ValueError:
+        pass
+    try:
+        return f"{datetime.strptime(value, '%Y-%m-%d').timestamp():.6f}"
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a YYYY-MM-DD date or a unix timestamp")
+
+
+def parse_byte_size(value: str):
+    # accepts plain bytes or a KB, MB, GB or TB suffix
+    units = {"KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4}
+    value = value.strip().upper()
+    try:
+        for unit, multiplier in units.items():
+            if value.endswith(unit):
+                return int(float(value[:-len(unit)]) * multiplier)
+        return int(value.rstrip("B"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a size like 500MB")
+
+
+def parse_types(value: str):
+    return [file_type.strip() for file_type in value.split(",") if file_type.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export Slack chat history without the GUI.")
+    parser.add_argument("--token", default=os.environ.get("SLACK_USER_TOKEN"),
+                        help="Slack user token (defaults to the SLACK_USER_TOKEN environment variable)")
+    parser.add_argument("--chat-type", choices=chat_types.keys(), default="channel",
+                        help="type of chats to export")
+    parser.add_argument("--chat", action="append", default=[], metavar="NAME_OR_ID",
+                        help="chat name or id to export, can be repeated")
+    parser.add_argument("--all", action="store_true", help="export every chat of the selected type")
+    parser.add_argument("--output", default=os.getcwd(), help="folder to save the chat history in")
+    parser.add_argument("--no-media", action="store_true", help="do not download media files")
+    parser.add_argument("--media-mode", choices=["original", "thumbnails", "thumbnails_only"], default="original",
+                        help="show downloaded originals inline, show slack thumbnails inline and link the downloaded "
+                             "originals, or download only the thumbnails and link the originals on slack")
+    parser.add_argument("--thumbnail-size", type=int, choices=[360, 720], default=720,
+                        help="slack thumbnail width used by the thumbnail media modes")
+    parser.add_argument("--max-file-size", type=parse_byte_size, metavar="SIZE",
+                        help="do not download files larger than this, e.g. 200MB")
+    parser.add_argument("--allow-types", type=parse_types, metavar="TYPES",
+                        help="only download these comma separated filetypes or mimetypes, e.g. png,jpg,video/*")
+    parser.add_argument("--deny-types", type=parse_types, metavar="TYPES",
+                        help="never download these comma separated filetypes or mimetypes")
+    parser.add_argument("--chat-byte-budget", type=parse_byte_size, metavar="SIZE",
+                        help="download at most this much media per chat, skipping the largest files first")
+    parser.add_argument("--run-byte-budget", type=parse_byte_size, metavar="SIZE",
+                        help="download at most this much media over the whole run")
+    parser.add_argument("--media-bandwidth", type=parse_byte_size, metavar="SIZE",
+                        help="limit media downloads to this many bytes per second, e.g. 2MB")
+    parser.add_argument("--no-api-priority", action="store_true",
+                        help="let media downloads run while slack api calls are in flight")
+    parser.add_argument("--segment-threshold", type=parse_byte_size, default=default_segment_threshold,
+                        metavar="SIZE",
+                        help="download files at least this large as several parallel Range requests")
+    parser.add_argument("--segments", type=int, default=4,
+                        help="number of parallel Range requests used for large files, 1 turns it off")
+    parser.add_argument("--oldest", type=parse_time_bound, metavar="DATE",
+                        help="only export messages after this YYYY-MM-DD date or unix timestamp")
+    parser.add_argument("--latest", type=parse_time_bound, metavar="DATE",
+                        help="only export messages before this YYYY-MM-DD date or unix timestamp")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="split the history into this many time windows that are fetched in parallel")
+    parser.add_argument("--shard-workers", type=int, default=4,
+                        help="number of time windows fetched at the same time when --shards is above 1")
+    parser.add_argument("--layout", choices=["single", "days", "virtual"], default="single",
+                        help="write one html file per chat, one fragment per day that later syncs only rewrite "
+                             "when the day changed, or json chunks of which the page only renders those near the "
+                             "visible window")
+    parser.add_argument("--format", choices=["html", "markdown", "text"], default="html",
+                        help="write each chat as an html page, or as a markdown or plain text file with threads "
+                             "inlined under their parent messages")
+    parser.add_argument("--bundle", choices=["zip", "tar.zst"],
+                        help="stream the pages, scripts and media into a zip or zstd compressed tar in the output "
+                             "folder instead of writing a folder tree, tar.zst needs zstandard")
+    parser.add_argument("--bundle-per", choices=["run", "chat"], default="run",
+                        help="with --bundle, write one bundle for the whole run with a workspace index, or one bundle "
+                             "per chat")
+    parser.add_argument("--full-sync", action="store_true",
+                        help="with --layout days, fetch the whole history again instead of starting from the newest "
+                             "exported day")
+    parser.add_argument("--reconcile-days", type=int, default=7,
+                        help="with --layout days, also rescan this many days before the newest exported day for "
+                             "edits, deletions and new thread replies")
+    parser.add_argument("--no-render-cache", action="store_true",
+                        help="render every message again instead of reusing fragments cached by earlier exports")
+    parser.add_argument("--no-thread-cache", action="store_true",
+                        help="fetch every thread again instead of reusing replies of threads that did not change")
+    parser.add_argument("--no-search-index", action="store_true",
+                        help="do not write the index the exported page uses to search messages and thread replies")
+    parser.add_argument("--archive", metavar="PATH",
+                        help="also write every exported conversation, message, thread reply, user and file into a "
+                             "single sqlite database with full text search, kept and updated across runs (with "
+                             "--layout days only the days rendered in this run are added)")
+    parser.add_argument("--parquet", metavar="FOLDER",
+                        help="also write messages, thread replies and files as messages.parquet and files.parquet "
+                             "into FOLDER for analytics, needs pyarrow (with --layout days only the days rendered in "
+                             "this run are written)")
+    parser.add_argument("--search", metavar="QUERY",
+                        help="search the --archive database with an sqlite fts5 query and print the matches instead "
+                             "of exporting")
+    parser.add_argument("--serve", action="store_true",
+                        help="serve the --output folder over http with range requests for media, and with --archive "
+                             "a json api and a viewer page that load messages, threads and search results on demand")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address --serve listens on, 0.0.0.0 shares the viewer on the local network")
+    parser.add_argument("--port", type=int, default=8080, help="port --serve listens on")
+    parser.add_argument("--users-cache", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "users.json"),
+                        help="json file used to cache user names between runs")
+    parser.add_argument("--profile", action="store_true",
+                        help="write per-stage cProfile and memory stats into a profile folder next to each export")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="write a Chrome Trace Event JSON timeline of the export run to PATH")
+    args = parser.parse_args(argv)
+    if args.search is not None:
+        if not args.archive:
+            parser.error("--search needs the --archive database to search")
+        return args
+    if args.serve:
+        return args
+    if args.format != "html" and args.layout != "single":
+        parser.error("--layout days and virtual are only available with --format html")
+    if args.bundle and args.layout == "days":
+        parser.error("--layout days updates the day files of earlier exports and cannot be written into a --bundle")
+    if not args.token:
+        parser.error("a Slack token is required, pass --token or set SLACK_USER_TOKEN")
+    return args
+
+
+def get_chat_name(exporter, chat_type: str, chat: dict):
+    if chat_type != "dm":
+        return chat["name"]
+    user_data = exporter.get_user_data(user_id=chat["user"])
+    return f"{user_data['name']} ({user_data['real_name']})"
+
+
+def search_archive(archive_path: str, query: str):
+    import sqlite3
+
+    from libraries.archive import SqliteArchive
+
+    if not os.path.exists(archive_path):
+        logger.error(f"Archive {archive_path} does not exist.")
+        return 1
+    archive = SqliteArchive(archive_path=archive_path)
+    try:
+        results = archive.search(query=query)
+    except sqlite3.Error as e:
+        logger.error(f"Invalid search query {query!r}: {e}")
+        return 1
+    finally:
+        archive.close()
+    for result in results:
+        timestamp = datetime.fromtimestamp(float(result["ts"])).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"{result['chat_name']}\t{timestamp}\t{result['user']}\t{result['snippet']}")
+    return 0
+
+
+def serve_export(args):
+    from libraries.archive import SqliteArchive
+    from libraries.viewer import ArchiveViewer
+
+    if args.archive and not os.path.exists(args.archive):
+        logger.error(f"Archive {args.archive} does not exist.")
+        return 1
+    archive = SqliteArchive(archive_path=args.archive)
+    try:
+        ArchiveViewer(root_path=args.output, archive=archive, host=args.host, port=args.port).serve()
+    finally:
+        archive.close()
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    if args.search is not None:
+        return search_archive(archive_path=args.archive, query=args.search)
+    if args.serve:
+        return serve_export(args)
+    # imported after the arguments are parsed so --help and usage errors do not pay for slack_sdk
+    from libraries.archive import SqliteArchive
+    from libraries.bundle import OutputBundle
+    from libraries.columnar import ParquetWriter
+    from libraries.exporter import ChatExporter
+    from libraries.media import MediaPolicy
+    from libraries.profiling import ExportProfiler
+    from libraries.scheduler import TransferScheduler
+    from libraries.tracing import TraceRecorder
+
+    users = {}
+    if os.path.exists(args.users_cache):
+        with open(args.users_cache, "r") as f:
+            users = json.load(f)
+    profiler = ExportProfiler(enabled=args.profile)
+    tracer = TraceRecorder(trace_path=args.trace)
+    archive = SqliteArchive(archive_path=args.archive)
+    parquet = ParquetWriter(folder_path=args.parquet)
+    bundle = OutputBundle(root_path=args.output if args.bundle else None, bundle_format=args.bundle,
+                          per_chat=args.bundle_per == "chat")
+    exporter = ChatExporter(token=args.token, users=users, profiler=profiler, tracer=tracer,
+                            render_cache=not args.no_render_cache, thread_cache=not args.no_thread_cache,
+                            media_mode=args.media_mode, thumbnail_size=args.thumbnail_size,
+                            media_policy=MediaPolicy(
+                                max_file_size=args.max_file_size,
+                                allowed_types=args.allow_types,
+                                denied_types=args.deny_types,
+                                chat_byte_budget=args.chat_byte_budget,
+                                run_byte_budget=args.run_byte_budget
+                            ),
+                            scheduler=TransferScheduler(
+                                media_bytes_per_second=args.media_bandwidth,
+                                api_priority=not args.no_api_priority
+                            ),
+                            segment_threshold=args.segment_threshold, segment_count=args.segments,
+                            archive=archive, search_index=not args.no_search_index, parquet=parquet,
+                            output_format=args.format, bundle=bundle)
+    with profiler.stage("listing"):
+        chats = exporter.slack_client.get_chats_list(chat_type=args.chat_type)
+        chat_names = [get_chat_name(exporter=exporter, chat_type=args.chat_type, chat=chat) for chat in chats]
+    profiler.dump(folder_path=args.output)
+    if not args.all and not args.chat:
+        # nothing selected, just list what can be exported
+        for chat, chat_name in zip(chats, chat_names):
+            print(f"{chat['id']}\t{chat_name}")
+        return 0
+    selected_chats = [
+        (chat, chat_name) for chat, chat_name in zip(chats, chat_names)
+        if args.all or chat["id"] in args.chat or chat_name in args.chat or chat.get("name") in args.chat
+    ]
+    if not selected_chats:
+        logger.error(f"No {args.chat_type} chats matched {args.chat}.")
+        return 1
+    failed_chats = []
+    for chat_index, (chat, chat_name) in enumerate(selected_chats):
+        logger.info(f"Saving chat {chat_index + 1} of {len(selected_chats)} selected chats...")
+        try:
+            exporter.export_chat(
+                chat_id=chat["id"],
+                chat_name=chat_name,
+                chat_type=chat_types[args.chat_type],
+                save_path=args.output,
+                save_media=not args.no_media,
+                oldest=args.oldest,
+                latest=args.latest,
+                shard_count=args.shards,
+                shard_workers=args.shard_workers,
+                page_layout=args.layout,
+                full_sync=args.full_sync,
+                reconcile_days=args.reconcile_days
+            )
+        except Exception as e:
+            # the chat keeps its earlier export, the other selected chats are still saved
+            logger.exception(e)
+            logger.error(f"Error exporting {chat_name}, its earlier export was left as it was: {e}")
+            failed_chats.append(chat_name)
+    exporter.save_workspace_index(save_path=args.output)
+    bundle.close()
+    with open(args.users_cache, "w") as f:
+        json.dump(users, f)
+    archive.close()
+    parquet.close()
+    tracer.save()
+    if failed_chats:
+        logger.error(f"{len(failed_chats)} of {len(selected_chats)} chats could not be exported: "
+                     f"{', '.join(failed_chats)}")
+        return 1
+    logger.info("All Chat history saved successfully!")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
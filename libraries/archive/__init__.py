@@ -0,0 +1,240 @@
+import logging
+import os
+import sqlite3
+from typing import Optional
+
+from libraries.models import SlackMessage
+
+logger = logging.getLogger(__name__)
+
+archive_schema = """
+    CREATE TABLE IF NOT EXISTS conversations (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        type TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS users (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        real_name TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS messages (
+        channel TEXT NOT NULL,
+        ts TEXT NOT NULL,
+        thread_ts TEXT,
+        user TEXT,
+        text TEXT NOT NULL,
+        reply_count INTEGER NOT NULL,
+        latest_reply TEXT,
+        edited_ts TEXT,
+        UNIQUE (channel, ts)
+    );
+    CREATE INDEX IF NOT EXISTS messages_thread ON messages (channel, thread_ts);
+    CREATE TABLE IF NOT EXISTS files (
+        id TEXT NOT NULL,
+        channel TEXT NOT NULL,
+        ts TEXT NOT NULL,
+        name TEXT,
+        filetype TEXT,
+        mimetype TEXT,
+        size INTEGER,
+        url_private TEXT,
+        PRIMARY KEY (id, channel, ts)
+    );
+    CREATE INDEX IF NOT EXISTS files_message ON files (channel, ts);
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        text, content='messages', content_rowid='rowid', tokenize='unicode61'
+    );
+    CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts (rowid, text) VALUES (new.rowid, new.text);
+    END;
+    CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+    END;
+    CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF text ON messages BEGIN
+        INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+        INSERT INTO messages_fts (rowid, text) VALUES (new.rowid, new.text);
+    END;
+"""
+
+message_columns = "channel, ts, thread_ts, user, text, reply_count, latest_reply, edited_ts"
+
+
+class SqliteArchive:
+    # every exported conversation, message, thread reply, user and file in one database with full text search,
+    # re-exports update rows in place so the archive can be kept across runs
+    def __init__(self, archive_path: Optional[str] = None, commit_every: int = 1000):
+        self.archive_path = archive_path
+        self.enabled = bool(archive_path)
+        self.commit_every = commit_every
+        self.pending_writes = 0
+        self.connection = None
+        if not self.enabled:
+            return
+        try:
+            if os.path.dirname(archive_path) and not os.path.exists(os.path.dirname(archive_path)):
+                os.makedirs(os.path.dirname(archive_path))
+            self.connection = sqlite3.connect(archive_path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.execute("PRAGMA synchronous = NORMAL")
+            self.connection.executescript(archive_schema)
+        except sqlite3.Error as e:
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "__init__",
+                "error_message": "Error opening archive, exporting without it.",
+                "archive_path": archive_path,
+                "error": str(e)
+            })
+            self.enabled = False
+            self.connection = None
+
+    def write(self, query: str, values: tuple):
+        # writes are grouped into one transaction per batch instead of one per row
+        self.connection.execute(query, values)
+        self.pending_writes += 1
+        if self.pending_writes >= self.commit_every:
+            self.connection.commit()
+            self.pending_writes = 0
+
+    def add_conversation(self, chat_id: str, chat_name: str, chat_type: str):
+        if not self.enabled:
+            return
+        self.write(
+            "INSERT INTO conversations VALUES (?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET name = excluded.name, type = excluded.type",
+            (chat_id, chat_name, chat_type)
+        )
+
+    def add_users(self, users: dict):
+        if not self.enabled:
+            return
+        for user_id, user_data in users.items():
+            self.write(
+                "INSERT INTO users VALUES (?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET name = excluded.name, real_name = excluded.real_name",
+                (user_id, user_data["name"], user_data["real_name"])
+            )
+
+    def add_message(self, chat_id: str, message: SlackMessage, thread_ts: Optional[str] = None):
+        if not self.enabled:
+            return
+        # an upsert keeps the rowid, so the full text index is updated through the update trigger
+        self.write(
+            "INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (channel, ts) DO UPDATE SET thread_ts = excluded.thread_ts, user = excluded.user, "
+            "text = excluded.text, reply_count = excluded.reply_count, latest_reply = excluded.latest_reply, "
+            "edited_ts = excluded.edited_ts",
+            (chat_id, message.ts, thread_ts, message.user, message.text, message.reply_count, message.latest_reply,
+             message.edited_ts)
+        )
+        for file in message.files:
+            if not file.id:
+                continue
+            self.write(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (file.id, chat_id, message.ts, file.name, file.filetype, file.mimetype, file.size, file.url_private)
+            )
+
+    def search(self, query: str, limit: int = 50):
+        if not self.enabled:
+            return []
+        rows = self.connection.execute(
+            "SELECT conversations.name, messages.channel, messages.ts, messages.thread_ts, "
+            "COALESCE(users.real_name, messages.user), snippet(messages_fts, 0, '[', ']', '...', 12) "
+            "FROM messages_fts "
+            "JOIN messages ON messages.rowid = messages_fts.rowid "
+            "LEFT JOIN conversations ON conversations.id = messages.channel "
+            "LEFT JOIN users ON users.id = messages.user "
+            "WHERE messages_fts MATCH ? ORDER BY rank LIMIT ?",
+            (query, limit)
+        ).fetchall()
+        return [
+            {"chat_name": row[0], "chat_id": row[1], "ts": row[2], "thread_ts": row[3], "user": row[4],
+             "snippet": row[5]}
+            for row in rows
+        ]
+
+    def get_conversations(self):
+        if not self.enabled:
+            return []
+        rows = self.connection.execute(
+            "SELECT conversations.id, conversations.name, conversations.type, "
+            "(SELECT COUNT(*) FROM messages WHERE messages.channel = conversations.id AND messages.thread_ts IS NULL), "
+            "(SELECT MAX(ts) FROM messages WHERE messages.channel = conversations.id) "
+            "FROM conversations ORDER BY conversations.name"
+        ).fetchall()
+        return [
+            {"id": row[0], "name": row[1], "type": row[2], "messages": row[3], "last_ts": row[4]}
+            for row in rows
+        ]
+
+    def get_users(self):
+        if not self.enabled:
+            return {}
+        return {
+            row[0]: {"name": row[1], "real_name": row[2]}
+            for row in self.connection.execute("SELECT id, name, real_name FROM users")
+        }
+
+    def get_messages(self, chat_id: str, before: Optional[str] = None, until: Optional[str] = None,
+                     limit: int = 100):
+        # newest first, pages continue from the ts of the oldest message of the previous page through the
+        # (channel, ts) index, so every page costs the same however deep into the history it is
+        if not self.enabled:
+            return []
+        query = f"SELECT {message_columns} FROM messages WHERE channel = ? AND thread_ts IS NULL"
+        values = [chat_id]
+        if before is not None:
+            query += " AND ts < ?"
+            values.append(before)
+        if until is not None:
+            query += " AND ts <= ?"
+            values.append(until)
+        rows = self.connection.execute(f"{query} ORDER BY ts DESC LIMIT ?", (*values, limit)).fetchall()
+        return self.get_message_dicts(chat_id=chat_id, rows=rows)
+
+    def get_replies(self, chat_id: str, thread_ts: str):
+        if not self.enabled:
+            return []
+        rows = self.connection.execute(
+            f"SELECT {message_columns} FROM messages WHERE channel = ? AND thread_ts = ? ORDER BY ts",
+            (chat_id, thread_ts)
+        ).fetchall()
+        return self.get_message_dicts(chat_id=chat_id, rows=rows)
+
+    def get_message_dicts(self, chat_id: str, rows: list):
+        messages = [
+            {"channel": row[0], "ts": row[1], "thread_ts": row[2], "user": row[3], "text": row[4],
+             "reply_count": row[5], "latest_reply": row[6], "edited_ts": row[7], "files": []}
+            for row in rows
+        ]
+        if not messages:
+            return messages
+        # one range scan of the (channel, ts) index instead of a bound parameter per message, files of other messages
+        # in the range are skipped
+        messages_by_ts = {message["ts"]: message for message in messages}
+        for row in self.connection.execute(
+            "SELECT ts, id, name, filetype, mimetype, size FROM files "
+            "WHERE channel = ? AND ts BETWEEN ? AND ? ORDER BY ts, rowid",
+            (chat_id, min(messages_by_ts), max(messages_by_ts))
+        ):
+            if row[0] not in messages_by_ts:
+                continue
+            messages_by_ts[row[0]]["files"].append(
+                {"id": row[1], "name": row[2], "filetype": row[3], "mimetype": row[4], "size": row[5]}
+            )
+        return messages
+
+    def flush(self):
+        if not self.connection:
+            return
+        self.connection.commit()
+        self.pending_writes = 0
+
+    def close(self):
+        if not self.connection:
+            return
+        self.connection.commit()
+        self.connection.close()
+        self.connection = None
@@ -0,0 +1,238 @@
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# the bundle file is written through a buffer this large, so network storage sees few large sequential writes
+write_buffer_size = 8 * 1024 * 1024
+
+copy_chunk_size = 1024 * 1024
+
+# entries smaller than this are kept in memory until they are complete, larger ones spill into one temporary file
+spool_size = 16 * 1024 * 1024
+
+# media that is already compressed is stored as it is in zip bundles instead of being deflated again
+stored_extensions = {
+    "jpg", "jpeg", "png", "gif", "webp", "heic", "mp4", "mov", "webm", "mkv", "m4a", "mp3", "ogg", "zip", "gz",
+    "zst", "7z", "rar", "pdf", "docx", "xlsx", "pptx"
+}
+
+
+class SequentialFile:
+    # only write and close, without tell or seek zipfile writes data descriptors instead of going back to headers
+    def __init__(self, path: str):
+        self.file = open(path, "wb", buffering=write_buffer_size)
+
+    def write(self, data: bytes):
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class BundleEntry:
+    # collects one text file in memory or a temporary file and adds it to the bundle once it is closed
+    def __init__(self, bundle: "OutputBundle", path: str):
+        self.bundle = bundle
+        self.path = path
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_size)
+
+    def write(self, text: str):
+        return self.file.write(text.encode("utf-8"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                size = self.file.tell()
+                self.file.seek(0)
+                self.bundle.add_stream(path=self.path, stream=self.file, size=size)
+        finally:
+            self.file.close()
+
+
+class OutputBundle:
+    # streams pages, scripts and media into one zip or zstd compressed tar per run or per chat instead of a folder
+    # tree, every entry is appended whole so the bundle file itself is only ever written sequentially
+    def __init__(self, root_path: Optional[str] = None, bundle_format: str = "zip", per_chat: bool = False,
+                 compression_level: int = 3):
+        self.root_path = root_path
+        self.enabled = bool(root_path)
+        self.bundle_format = bundle_format
+        self.per_chat = per_chat
+        self.compression_level = compression_level
+        self.lock = threading.Lock()
+        self.bundle_path = None
+        self.file = None
+        self.stream = None
+        self.writer = None
+        self.names = set()
+        self.bytes_written = 0
+        self.staging_path = None
+        # the folder of the chat being written, and whether a chat failed after adding entries to the run's bundle
+        self.chat_folder_name = None
+        self.failed = False
+        if not self.enabled:
+            return
+        if bundle_format == "tar.zst":
+            try:
+                import zstandard
+            except ImportError as e:
+                logger.error({
+                    "class": self.__class__.__name__,
+                    "method": "__init__",
+                    "error_message": "zstandard is not installed, exporting into folders instead of a bundle.",
+                    "error": str(e)
+                })
+                self.enabled = False
+                return
+            self.zstandard = zstandard
+        # downloads land here first, each file moves into the bundle as soon as it is complete
+        self.staging_path = tempfile.mkdtemp(prefix="nana-slack-bundle-")
+
+    def get_name(self, path: str):
+        return os.path.relpath(path, self.root_path).replace(os.sep, "/")
+
+    def get_staging_path(self, path: str):
+        staging_path = os.path.join(self.staging_path, self.get_name(path))
+        if not os.path.exists(os.path.dirname(staging_path)):
+            os.makedirs(os.path.dirname(staging_path))
+        return staging_path
+
+    def start_chat(self, folder_name: str):
+        if not self.enabled:
+            return
+        self.chat_folder_name = folder_name
+        if self.per_chat:
+            self.close_bundle()
+            self.open_bundle(file_name=f"{folder_name}.{self.bundle_format}")
+        elif not self.writer:
+            self.open_bundle(file_name=f"Nana Slack.{self.bundle_format}")
+
+    def finish_chat(self):
+        self.chat_folder_name = None
+        if self.enabled and self.per_chat:
+            self.close_bundle()
+
+    def abort_chat(self):
+        # a chat that failed part way must not replace the last complete bundle with a partial one
+        if not self.enabled or self.chat_folder_name is None:
+            return
+        chat_prefix = f"{self.chat_folder_name}/"
+        self.chat_folder_name = None
+        if self.per_chat:
+            self.discard_bundle()
+        elif any(name.startswith(chat_prefix) for name in self.names):
+            # entries cannot be taken back out of a bundle that is only written sequentially, so the whole run's
+            # bundle is dropped when it is closed
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "abort_chat",
+                "error_message": "A chat failed after parts of it were written, the bundle of this run is discarded.",
+                "chat_folder_name": chat_prefix[:-1],
+                "bundle_path": self.bundle_path
+            })
+            self.failed = True
+
+    def open_bundle(self, file_name: str):
+        if not os.path.exists(self.root_path):
+            os.makedirs(self.root_path)
+        self.bundle_path = f"{self.root_path}/{file_name}"
+        # written under a temporary name so an interrupted run does not replace the last complete bundle
+        self.file = SequentialFile(f"{self.bundle_path}.part")
+        if self.bundle_format == "tar.zst":
+            self.stream = self.zstandard.ZstdCompressor(level=self.compression_level, threads=-1).stream_writer(
+                self.file, closefd=False
+            )
+            self.writer = tarfile.open(fileobj=self.stream, mode="w|", format=tarfile.PAX_FORMAT)
+        else:
+            self.writer = zipfile.ZipFile(self.file, mode="w", allowZip64=True)
+        self.names = set()
+        self.bytes_written = 0
+
+    def close_bundle(self):
+        if not self.writer:
+            return
+        if self.failed:
+            self.discard_bundle()
+            return
+        with self.lock:
+            self.writer.close()
+            if self.stream:
+                self.stream.close()
+            self.file.close()
+            os.replace(f"{self.bundle_path}.part", self.bundle_path)
+            logger.info(f"Bundle of {len(self.names)} files ({self.bytes_written} bytes before compression) saved to "
+                        f"{self.bundle_path}")
+            self.writer = None
+            self.stream = None
+            self.file = None
+
+    def discard_bundle(self):
+        # closes the writer and removes the partial file, the last complete bundle stays in place
+        if not self.writer:
+            return
+        with self.lock:
+            try:
+                self.writer.close()
+                if self.stream:
+                    self.stream.close()
+            finally:
+                self.file.close()
+                os.remove(f"{self.bundle_path}.part")
+                logger.info(f"Bundle {self.bundle_path} was discarded, the last complete one was left as it was.")
+                self.writer = None
+                self.stream = None
+                self.file = None
+                self.failed = False
+
+    def contains(self, path: str):
+        return self.get_name(path) in self.names
+
+    def open(self, path: str):
+        return BundleEntry(bundle=self, path=path)
+
+    def add_stream(self, path: str, stream, size: int):
+        name = self.get_name(path)
+        with self.lock:
+            if self.bundle_format == "tar.zst":
+                tar_info = tarfile.TarInfo(name)
+                tar_info.size = size
+                tar_info.mtime = int(time.time())
+                tar_info.mode = 0o644
+                self.writer.addfile(tar_info, stream)
+            else:
+                zip_info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+                zip_info.file_size = size
+                zip_info.compress_type = zipfile.ZIP_STORED if name.rsplit(".", 1)[-1].lower() in stored_extensions \
+                    else zipfile.ZIP_DEFLATED
+                with self.writer.open(zip_info, "w") as f:
+                    shutil.copyfileobj(stream, f, copy_chunk_size)
+            self.names.add(name)
+            self.bytes_written += size
+
+    def add_file(self, path: str, source_path: str):
+        # moves a finished download into the bundle and removes it from the staging folder
+        try:
+            with open(source_path, "rb") as f:
+                self.add_stream(path=path, stream=f, size=os.path.getsize(source_path))
+        finally:
+            os.remove(source_path)
+
+    def close(self):
+        if not self.enabled:
+            return
+        self.close_bundle()
+        shutil.rmtree(self.staging_path, ignore_errors=True)
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import sqlite3
+from typing import Optional
+
+from libraries.models import SlackMessage
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteCache:
+    table_schema = ""
+
+    def __init__(self, cache_path: Optional[str] = None, commit_every: int = 500):
+        self.cache_path = cache_path
+        self.enabled = bool(cache_path)
+        self.commit_every = commit_every
+        self.pending_writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.connection = None
+        if not self.enabled:
+            return
+        try:
+            if not os.path.exists(os.path.dirname(cache_path)):
+                os.makedirs(os.path.dirname(cache_path))
+            self.connection = sqlite3.connect(cache_path)
+            self.connection.execute(self.table_schema)
+        except sqlite3.Error as e:
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "__init__",
+                "error_message": "Error opening cache, continuing without it.",
+                "cache_path": cache_path,
+                "error": str(e)
+            })
+            self.enabled = False
+            self.connection = None
+
+    def write(self, query: str, values: tuple):
+        self.connection.execute(query, values)
+        self.pending_writes += 1
+        if self.pending_writes >= self.commit_every:
+            self.connection.commit()
+            self.pending_writes = 0
+
+    def close(self):
+        if not self.connection:
+            return
+        self.connection.commit()
+        self.connection.close()
+        self.connection = None
+        logger.info(f"{self.__class__.__name__}: {self.hits} reused, {self.misses} fetched or rendered.")
+
+
+class RenderCache(SqliteCache):
+    # rendered html fragments keyed by (channel, kind, ts), reused while edited ts, renderer version and author match
+    table_schema = """
+        CREATE TABLE IF NOT EXISTS fragments (
+            channel TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            ts TEXT NOT NULL,
+            edited_ts TEXT NOT NULL,
+            renderer_version TEXT NOT NULL,
+            user_name TEXT NOT NULL,
+            html TEXT NOT NULL,
+            media TEXT NOT NULL,
+            PRIMARY KEY (channel, kind, ts)
+        )
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, renderer_version: str = "", commit_every: int = 500):
+        self.renderer_version = renderer_version
+        super().__init__(cache_path=cache_path, commit_every=commit_every)
+
+    def get(self, channel: str, kind: str, message: SlackMessage, user_name: str):
+        if not self.enabled:
+            return None
+        row = self.connection.execute(
+            "SELECT edited_ts, renderer_version, user_name, html, media FROM fragments "
+            "WHERE channel = ? AND kind = ? AND ts = ?",
+            (channel, kind, message.ts)
+        ).fetchone()
+        if row and row[:3] == (message.edited_ts or "", self.renderer_version, user_name):
+            self.hits += 1
+            return {"html": row[3], "media": json.loads(row[4])}
+        self.misses += 1
+        return None
+
+    def put(self, channel: str, kind: str, message: SlackMessage, user_name: str, result: dict):
+        if not self.enabled:
+            return
+        self.write(
+            "INSERT OR REPLACE INTO fragments VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (channel, kind, message.ts, message.edited_ts or "", self.renderer_version, user_name, result["html"],
+             json.dumps(result["media"]))
+        )
+
+
+class ThreadCache(SqliteCache):
+    # thread replies keyed by (channel, thread_ts), reused while the parent's reply_count and latest_reply match
+    table_schema = """
+        CREATE TABLE IF NOT EXISTS threads (
+            channel TEXT NOT NULL,
+            thread_ts TEXT NOT NULL,
+            reply_count INTEGER NOT NULL,
+            latest_reply TEXT NOT NULL,
+            replies TEXT NOT NULL,
+            PRIMARY KEY (channel, thread_ts)
+        )
+    """
+
+    def get(self, channel: str, message: SlackMessage):
+        # a parent without latest_reply cannot be checked for new replies, so its thread is always fetched
+        if not self.enabled or not message.latest_reply:
+            return None
+        row = self.connection.execute(
+            "SELECT reply_count, latest_reply, replies FROM threads WHERE channel = ? AND thread_ts = ?",
+            (channel, message.ts)
+        ).fetchone()
+        if row and row[:2] == (message.reply_count, message.latest_reply):
+            self.hits += 1
+            return [SlackMessage.from_dict(reply) for reply in json.loads(row[2])]
+        self.misses += 1
+        return None
+
+    def put(self, channel: str, message: SlackMessage, replies: list):
+        # an empty result for a parent with replies is a failed fetch and is not kept
+        if not self.enabled or not message.latest_reply or not replies:
+            return
+        self.write(
+            "INSERT OR REPLACE INTO threads VALUES (?, ?, ?, ?, ?)",
+            (channel, message.ts, message.reply_count, message.latest_reply,
+             json.dumps([reply.to_dict() for reply in replies]))
+        )
@@ -0,0 +1,126 @@
+import logging
+import os
+from typing import Optional
+
+from libraries.models import SlackMessage
+
+logger = logging.getLogger(__name__)
+
+
+class ParquetWriter:
+    # messages, thread replies and files as two parquet files with fixed schemas, rows are buffered per column and
+    # written as one row group per batch while the export runs, pyarrow is only needed when this is enabled
+    def __init__(self, folder_path: Optional[str] = None, batch_size: int = 50000):
+        self.folder_path = folder_path
+        self.enabled = bool(folder_path)
+        self.batch_size = batch_size
+        self.tables = {}
+        self.rows = {"messages": 0, "files": 0}
+        if not self.enabled:
+            return
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "__init__",
+                "error_message": "pyarrow is not installed, exporting without parquet files.",
+                "error": str(e)
+            })
+            self.enabled = False
+            return
+        self.pa = pa
+        schemas = {
+            "messages": pa.schema([
+                pa.field("channel", pa.string(), nullable=False),
+                pa.field("ts", pa.string(), nullable=False),
+                pa.field("posted_at", pa.timestamp("us", tz="UTC"), nullable=False),
+                pa.field("user", pa.string()),
+                pa.field("thread_ts", pa.string()),
+                pa.field("is_reply", pa.bool_(), nullable=False),
+                pa.field("reply_count", pa.int32(), nullable=False),
+                pa.field("latest_reply", pa.string()),
+                pa.field("edited_ts", pa.string()),
+                pa.field("text_length", pa.int32(), nullable=False),
+                pa.field("file_count", pa.int32(), nullable=False),
+                pa.field("file_bytes", pa.int64(), nullable=False),
+                pa.field("attachment_count", pa.int32(), nullable=False),
+            ]),
+            "files": pa.schema([
+                pa.field("channel", pa.string(), nullable=False),
+                pa.field("message_ts", pa.string(), nullable=False),
+                pa.field("id", pa.string()),
+                pa.field("name", pa.string()),
+                pa.field("filetype", pa.string()),
+                pa.field("mimetype", pa.string()),
+                pa.field("size", pa.int64(), nullable=False),
+            ]),
+        }
+        try:
+            if not os.path.exists(folder_path):
+                os.makedirs(folder_path)
+            for table_name, schema in schemas.items():
+                self.tables[table_name] = {
+                    "schema": schema,
+                    "writer": pq.ParquetWriter(f"{folder_path}/{table_name}.parquet", schema, compression="zstd"),
+                    "columns": {field.name: [] for field in schema}
+                }
+        except (OSError, pa.ArrowException) as e:
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "__init__",
+                "error_message": "Error opening parquet files, exporting without them.",
+                "folder_path": folder_path,
+                "error": str(e)
+            })
+            self.close()
+            self.enabled = False
+
+    def add_row(self, table_name: str, row: tuple):
+        table = self.tables[table_name]
+        for column, value in zip(table["columns"].values(), row):
+            column.append(value)
+        self.rows[table_name] += 1
+        if len(table["columns"]["channel"]) >= self.batch_size:
+            self.write_batch(table_name=table_name)
+
+    def write_batch(self, table_name: str):
+        table = self.tables[table_name]
+        if not table["columns"]["channel"]:
+            return
+        table["writer"].write_table(self.pa.Table.from_pydict(table["columns"], schema=table["schema"]))
+        for column in table["columns"].values():
+            column.clear()
+
+    def add_message(self, chat_id: str, message: SlackMessage, thread_ts: Optional[str] = None):
+        if not self.enabled:
+            return
+        self.add_row("messages", (
+            chat_id,
+            message.ts,
+            round(float(message.ts) * 1000000),
+            message.user,
+            thread_ts,
+            thread_ts is not None,
+            message.reply_count,
+            message.latest_reply,
+            message.edited_ts,
+            len(message.text or ""),
+            len(message.files),
+            sum(file.size for file in message.files),
+            len(message.attachments),
+        ))
+        for file in message.files:
+            self.add_row("files", (chat_id, message.ts, file.id, file.name, file.filetype, file.mimetype, file.size))
+
+    def close(self):
+        for table_name, table in self.tables.items():
+            try:
+                self.write_batch(table_name=table_name)
+            finally:
+                table["writer"].close()
+        if self.tables:
+            logger.info(f"Parquet export: {self.rows['messages']} messages and {self.rows['files']} files written "
+                        f"to {self.folder_path}.")
+        self.tables = {}
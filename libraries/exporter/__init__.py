@@ -0,0 +1,1940 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+from urllib.parse import quote
+
+from libraries.archive import SqliteArchive
+from libraries.bundle import OutputBundle
+from libraries.cache import RenderCache, ThreadCache
+from libraries.columnar import ParquetWriter
+from libraries.history import HistorySpool
+from libraries.media import MediaPolicy, default_segment_threshold
+from libraries.models import SlackFile, SlackMessage
+from libraries.mrkdwn import MrkdwnMarkdownRenderer, MrkdwnRenderer, MrkdwnTextRenderer, escape_html
+from libraries.pages import DayPageStore
+from libraries.profiling import ExportProfiler
+from libraries.scheduler import TransferScheduler
+from libraries.search import SearchIndex
+from libraries.stats import ChatStats
+from libraries.slack import SlackClient
+from libraries.tracing import TraceRecorder
+
+logger = logging.getLogger(__name__)
+
+render_chunk_size = 500
+
+# messages per script chunk in the virtual layout, the page keeps only the chunks near the viewport in the dom
+virtual_chunk_size = 200
+
+media_chunk_size = 64 * 1024
+
+# bump whenever the html produced for a message changes so cached fragments are rendered again
+renderer_version = "6"
+
+# document layout of the non html output formats, mrkdwn inside messages is converted by the renderer
+text_formats = {
+    "markdown": {
+        "extension": "md",
+        "renderer": MrkdwnMarkdownRenderer,
+        "title": "# {title}\n",
+        "date": "\n## {date}\n",
+        "message": "\n**{user_name}** {time}\n\n{body}\n",
+        "file": "\n[{file_name}](<{href}>){note}\n",
+        "skipped": " (not downloaded: {reason})",
+        "replies": "\n{count} replies:\n",
+        "reply_prefix": "> "
+    },
+    "text": {
+        "extension": "txt",
+        "renderer": MrkdwnTextRenderer,
+        "title": "{title}\n",
+        "date": "\n--- {date} ---\n",
+        "message": "\n{time} {user_name}:\n{body}\n",
+        "file": "[file] {file_name}: {href}{note}\n",
+        "skipped": " (not downloaded: {reason})",
+        "replies": "{count} replies:\n",
+        "reply_prefix": "    "
+    }
+}
+
+# bump whenever what a day fragment or its manifest entry holds changes so stored days are rendered again
+day_format_version = "2"
+
+
+class ChatExporter:
+    def __init__(self, token: str, users: Optional[dict] = None, profiler: Optional[ExportProfiler] = None,
+                 tracer: Optional[TraceRecorder] = None, progress_callback: Optional[Callable] = None,
+                 status_callback: Optional[Callable] = None, render_cache: bool = True, thread_cache: bool = True,
+                 media_mode: str = "original", thumbnail_size: int = 720, media_policy: Optional[MediaPolicy] = None,
+                 scheduler: Optional[TransferScheduler] = None, segment_threshold: int = default_segment_threshold,
+                 segment_count: int = 4, archive: Optional[SqliteArchive] = None, search_index: bool = True,
+                 parquet: Optional[ParquetWriter] = None, output_format: str = "html",
+                 bundle: Optional[OutputBundle] = None):
+        self.token = token
+        self.users = users if users is not None else {}
+        self.profiler = profiler or ExportProfiler()
+        self.tracer = tracer or TraceRecorder()
+        self.progress_callback = progress_callback
+        self.status_callback = status_callback
+        self.media_mode = media_mode
+        self.thumbnail_size = thumbnail_size
+        self.media_policy = media_policy or MediaPolicy()
+        self.use_render_cache = render_cache
+        self.render_cache = RenderCache()
+        self.use_thread_cache = thread_cache
+        self.thread_cache = ThreadCache()
+        self.scheduler = scheduler or TransferScheduler()
+        self.segment_threshold = segment_threshold
+        self.segment_count = segment_count
+        self.archive = archive or SqliteArchive()
+        self.parquet = parquet or ParquetWriter()
+        self.bundle = bundle or OutputBundle()
+        self.use_search_index = search_index
+        self.slack_client = SlackClient(token, tracer=self.tracer, scheduler=self.scheduler, profiler=self.profiler)
+        self.mrkdwn_renderer = MrkdwnRenderer(resolve_user=lambda user_id: self.get_user_data(user_id)["real_name"])
+        self.output_format = output_format
+        self.text_format = text_formats.get(output_format)
+        self.text_renderer = None
+        if self.text_format:
+            self.text_renderer = self.text_format["renderer"](
+                resolve_user=lambda user_id: self.get_user_data(user_id)["real_name"]
+            )
+        self.media_file_names = []
+        self.media_names = {}
+        # stats of the chats written into the bundle, its workspace index cannot read them back from the folders
+        self.bundle_chats = []
+
+    def update_progress(self, value: float):
+        if self.progress_callback:
+            self.progress_callback(int(value))
+
+    def update_status(self, text: str):
+        if self.status_callback:
+            self.status_callback(text)
+
+    def get_user_data(self, user_id: str):
+        if not user_id:
+            # messages without a user or bot id
+            return {"name": "Unknown", "real_name": "Unknown"}
+        try:
+            user_data = self.users[user_id]
+        except KeyError:
+            user_data = self.slack_client.get_user_name(user_id=user_id)
+            self.users[user_id] = user_data
+        return user_data
+
+    def export_chat(self, chat_id: str, chat_name: str, chat_type: str, save_path: str, save_media: bool,
+                    chat_progress_unit: float = 100, current_chat_progress: float = 0, oldest: Optional[str] = None,
+                    latest: Optional[str] = None, shard_count: int = 1, shard_workers: int = 4,
+                    page_layout: str = "single", full_sync: bool = False, reconcile_days: int = 7):
+        chat_start = self.tracer.now()
+        self.media_file_names = []
+        folder_name = f"Nana Slack - {chat_type} - {chat_name}".replace("<", "").replace(">", "").replace(":",
+                                                                                                          "").replace(
+            "?", "").replace("/", "").replace("\\", "").replace("*", "").replace("|", "").replace('"', "")
+        folder_path = f"{save_path}/{folder_name}"
+        if not os.path.exists(folder_path):
+            os.makedirs(folder_path)
+        media_folder_path = f"{folder_path}/media"
+        if not self.bundle.enabled:
+            if not os.path.exists(media_folder_path):
+                os.makedirs(media_folder_path)
+            # get all the file names in the media folder
+            for file in os.listdir(media_folder_path):
+                self.media_file_names.append(file)
+        render_signature = (f"{renderer_version}-{self.media_mode}-{self.thumbnail_size}-"
+                            f"{self.media_policy.get_signature()}")
+        chat_messages = HistorySpool()
+        media_downloads = {}
+        chat_complete = False
+        try:
+            if self.use_render_cache:
+                self.render_cache = RenderCache(
+                    cache_path=f"{folder_path}/.cache/render.sqlite3",
+                    renderer_version=render_signature
+                )
+            if self.use_thread_cache:
+                self.thread_cache = ThreadCache(cache_path=f"{folder_path}/.cache/threads.sqlite3")
+            media_names_path = f"{folder_path}/.cache/media_names.json"
+            self.media_names = {}
+            if os.path.exists(media_names_path):
+                with open(media_names_path, "r") as f:
+                    self.media_names = json.load(f)
+            day_pages = None
+            if page_layout == "days" and not self.text_format:
+                day_pages = DayPageStore(
+                    folder_path=f"{folder_path}/days",
+                    renderer_version=f"{render_signature}-{day_format_version}-{int(self.use_search_index)}"
+                )
+                oldest, latest = day_pages.get_sync_window(
+                    oldest=oldest,
+                    latest=latest,
+                    full_sync=full_sync,
+                    reconcile_days=reconcile_days
+                )
+            self.archive.add_conversation(chat_id=chat_id, chat_name=chat_name, chat_type=chat_type)
+            with self.profiler.stage("history"):
+                # a partial history would overwrite a complete earlier export, and in the days layout it would delete
+                # the days it is missing, so a failed fetch or a failed shard fails the whole chat
+                if shard_count > 1:
+                    chat_messages.extend_shards(self.slack_client.iter_sharded_chat_history_pages(
+                        chat_id=chat_id,
+                        chat_name=chat_name,
+                        oldest=oldest,
+                        latest=latest,
+                        shard_count=shard_count,
+                        max_workers=shard_workers
+                    ))
+                else:
+                    chat_messages.extend(self.slack_client.iter_chat_history_pages(
+                        chat_id=chat_id,
+                        chat_name=chat_name,
+                        oldest=oldest,
+                        latest=latest,
+                        raise_errors=True
+                    ))
+            # only once the history is complete, a chat that failed to fetch leaves its earlier bundle in place
+            self.bundle.start_chat(folder_name=folder_name)
+            if not self.text_format:
+                self.save_page_assets(save_path=save_path)
+            self.media_policy.start_chat()
+            if save_media:
+                media_downloads = self.prefetch_chat_media(
+                    chat_id=chat_id,
+                    media_folder_path=media_folder_path,
+                    oldest=oldest,
+                    latest=latest
+                )
+            html_result = {
+                "media": [],
+                "current_message_progress": current_chat_progress,
+                "search_index": (SearchIndex() if self.use_search_index and not day_pages and not self.text_format
+                                 else None),
+                "stats": ChatStats()
+            }
+            with self.profiler.stage("render"):
+                if self.text_format:
+                    html_content = self.convert_chat_to_text(
+                        chat_id=chat_id,
+                        chat_name=chat_name,
+                        chat_type=chat_type,
+                        chat_messages=chat_messages,
+                        chat_progress_unit=chat_progress_unit,
+                        current_chat_progress=current_chat_progress,
+                        html_result=html_result
+                    )
+                elif day_pages:
+                    self.save_chat_days(
+                        chat_id=chat_id,
+                        chat_messages=chat_messages,
+                        chat_progress_unit=chat_progress_unit,
+                        current_chat_progress=current_chat_progress,
+                        html_result=html_result,
+                        day_pages=day_pages,
+                        oldest=oldest,
+                        latest=latest
+                    )
+                    html_content = self.convert_day_pages_to_html(
+                        chat_name=chat_name,
+                        chat_type=chat_type,
+                        day_pages=day_pages
+                    )
+                elif page_layout == "virtual":
+                    chunks = self.save_chat_chunks(
+                        chat_id=chat_id,
+                        chat_messages=chat_messages,
+                        chat_progress_unit=chat_progress_unit,
+                        current_chat_progress=current_chat_progress,
+                        html_result=html_result,
+                        folder_path=f"{folder_path}/chunks"
+                    )
+                    html_content = self.convert_chunk_pages_to_html(
+                        chat_name=chat_name,
+                        chat_type=chat_type,
+                        chunks=chunks
+                    )
+                else:
+                    html_content = self.convert_chat_to_html(
+                        chat_id=chat_id,
+                        chat_name=chat_name,
+                        chat_type=chat_type,
+                        chat_messages=chat_messages,
+                        chat_progress_unit=chat_progress_unit,
+                        current_chat_progress=current_chat_progress,
+                        html_result=html_result,
+                    )
+                self.save_chat_to_file(
+                    chat_name=chat_name,
+                    chat_type=chat_type,
+                    html_content=html_content,
+                    folder_path=folder_path
+                )
+            if html_result["search_index"] is not None:
+                self.save_search_index(search_index=html_result["search_index"], folder_path=folder_path)
+            self.save_chat_stats(
+                chat_id=chat_id,
+                chat_name=chat_name,
+                chat_type=chat_type,
+                stats=day_pages.get_stats() if day_pages else html_result["stats"],
+                folder_path=folder_path
+            )
+            self.archive.add_users(users=self.users)
+            self.archive.flush()
+            if not os.path.exists(f"{folder_path}/.cache"):
+                os.makedirs(f"{folder_path}/.cache")
+            with open(media_names_path, "w") as f:
+                json.dump(self.media_names, f)
+            current_message_progress = html_result.get("current_message_progress")
+            save_html_unit = chat_progress_unit * 0.1
+            current_html_progress = save_html_unit + current_message_progress
+            self.update_progress(current_html_progress)
+            if save_media:
+                with self.profiler.stage("media"):
+                    self.finish_chat_media(
+                        chat_name=chat_name,
+                        chat_type=chat_type,
+                        media=html_result.get("media"),
+                        downloads=media_downloads,
+                        chat_progress_unit=chat_progress_unit,
+                        current_html_progress=current_html_progress,
+                        media_folder_path=media_folder_path
+                    )
+            self.bundle.finish_chat()
+            self.media_policy.log_chat(chat_name=chat_name)
+            self.profiler.dump(folder_path=folder_path)
+            self.tracer.record("chat", "export", start=chat_start, chat_id=chat_id, chat_name=chat_name)
+            chat_complete = True
+        finally:
+            if not chat_complete:
+                # prefetched files still downloading would otherwise land in the bundle after it was discarded
+                for download in media_downloads.values():
+                    download.cancel()
+                wait(media_downloads.values())
+                self.bundle.abort_chat()
+            # also when the export fails part way, so no copy of the history is left in the temporary folder and the
+            # cache connections are not left open
+            chat_messages.close()
+            self.render_cache.close()
+            self.render_cache = RenderCache()
+            self.thread_cache.close()
+            self.thread_cache = ThreadCache()
+        return folder_path
+
+    def convert_chat_to_html(self, chat_id: str, chat_name: str, chat_type: str, chat_messages: HistorySpool,
+                             chat_progress_unit: float, current_chat_progress: float, html_result: dict):
+        # yields the page in chunks so it can be written out while the messages are still being rendered
+        try:
+            yield page_head_start + f"Nana Slack | {chat_type} | {chat_name}" + page_head_end
+            with tempfile.TemporaryFile("w+", encoding="utf-8") as replies_file:
+                yield from self.convert_chat_messages_to_html(
+                    chat_id=chat_id,
+                    chat_messages=chat_messages,
+                    chat_progress_unit=chat_progress_unit,
+                    current_chat_progress=current_chat_progress,
+                    replies_file=replies_file,
+                    html_result=html_result
+                )
+                yield page_tail_start
+                yield "<script>replies = {"
+                replies_file.seek(0)
+                for line_index, line in enumerate(replies_file):
+                    yield ("," if line_index else "") + line.rstrip("\n")
+                yield "};</script>"
+            yield page_tail_end
+        except Exception as e:
+            logger.exception(e)
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "convert_chat_to_html",
+                "error_message": "Error converting chat to html",
+                "chat_name": chat_name,
+                "error": str(e)
+            })
+
+    def convert_chat_messages_to_html(self, chat_id, chat_messages: HistorySpool, chat_progress_unit: float,
+                                      current_chat_progress: float, replies_file, html_result: dict):
+        media_list = html_result["media"]
+        html = ""
+        last_date = ""
+        total_messages = len(chat_messages)
+        current_message_progress = current_chat_progress
+        chunk_start = self.tracer.now()
+        for message_index, message in enumerate(chat_messages):
+            if message_index and message_index % render_chunk_size == 0:
+                self.tracer.record("render chunk", "render", start=chunk_start, chat_id=chat_id,
+                                   first_message=message_index - render_chunk_size, messages=render_chunk_size)
+                yield html
+                html = ""
+                html_result["current_message_progress"] = current_message_progress
+                chunk_start = self.tracer.now()
+            try:
+                message_progress_unit = chat_progress_unit * 0.4 / total_messages * (message_index + 1)
+                current_message_progress = current_chat_progress + message_progress_unit
+                self.update_progress(current_message_progress)
+                self.update_status(f"Saving {message_index + 1} of {total_messages} messages...")
+                message_result = self.convert_chat_message_to_html(
+                    chat_id=chat_id,
+                    message=message,
+                    media_list=media_list,
+                    search_index=html_result["search_index"],
+                    stats=html_result["stats"]
+                )
+                # add line break if date changed
+                if message_result["date"] != last_date:
+                    html += self.convert_date_to_html(date=message_result["date"])
+                    last_date = message_result["date"]
+                html += message_result["html"]
+                if message_result["replies"]:
+                    replies_file.write(
+                        f"{json.dumps(message.ts)}: {json.dumps(message_result['replies'], ensure_ascii=True)}\n"
+                    )
+            except Exception as e:
+                logger.exception(e)
+                logger.error({
+                    "class": self.__class__.__name__,
+                    "method": "convert_chat_messages_to_html",
+                    "error_message": "Error converting chat messages to html",
+                    "chat_id": chat_id,
+                    "chat_message": message,
+                    "error": str(e)
+                })
+        if total_messages:
+            self.tracer.record("render chunk", "render", start=chunk_start, chat_id=chat_id,
+                               first_message=(total_messages - 1) // render_chunk_size * render_chunk_size,
+                               messages=(total_messages - 1) % render_chunk_size + 1)
+        self.media_file_names = []
+        html_result["current_message_progress"] = current_message_progress
+        yield html
+
+    def convert_chat_days_to_html(self, chat_id, chat_messages: HistorySpool, chat_progress_unit: float,
+                                  current_chat_progress: float, html_result: dict, dates: Optional[set] = None):
+        # yields one {"date", "html", "replies", "messages", "search"} dict per local calendar day, only for the given
+        # dates
+        media_list = html_result["media"]
+        day = None
+        total_messages = len(chat_messages)
+        for message_index, message in enumerate(chat_messages):
+            date = datetime.fromtimestamp(float(message.ts)).strftime("%Y-%m-%d")
+            if dates is not None and date not in dates:
+                continue
+            try:
+                message_progress_unit = chat_progress_unit * 0.4 / total_messages * (message_index + 1)
+                html_result["current_message_progress"] = current_chat_progress + message_progress_unit
+                self.update_progress(html_result["current_message_progress"])
+                self.update_status(f"Saving {message_index + 1} of {total_messages} messages...")
+                if day is None or date != day["date"]:
+                    if day:
+                        yield day
+                    day = {
+                        "date": date,
+                        "html": self.convert_date_to_html(date=date),
+                        "replies": {},
+                        "messages": 0,
+                        "search": SearchIndex() if self.use_search_index else None,
+                        "stats": ChatStats()
+                    }
+                message_result = self.convert_chat_message_to_html(
+                    chat_id=chat_id,
+                    message=message,
+                    media_list=media_list,
+                    search_index=day["search"],
+                    stats=day["stats"]
+                )
+                day["html"] += message_result["html"]
+                day["messages"] += 1
+                if message_result["replies"]:
+                    day["replies"][message.ts] = message_result["replies"]
+            except Exception as e:
+                logger.exception(e)
+                logger.error({
+                    "class": self.__class__.__name__,
+                    "method": "convert_chat_days_to_html",
+                    "error_message": "Error converting chat messages to html",
+                    "chat_id": chat_id,
+                    "chat_message": message,
+                    "error": str(e)
+                })
+        self.media_file_names = []
+        if day:
+            yield day
+
+    def save_chat_days(self, chat_id, chat_messages: HistorySpool, chat_progress_unit: float,
+                       current_chat_progress: float, html_result: dict, day_pages: DayPageStore,
+                       oldest: Optional[str] = None, latest: Optional[str] = None):
+        # days whose messages look the same as in the last sync keep their fragment without being rendered again
+        fingerprints = day_pages.get_fingerprints(messages=chat_messages)
+        changed_dates = day_pages.get_changed_dates(fingerprints=fingerprints)
+        day_pages.skipped_days += len(fingerprints) - len(changed_dates)
+        for day in self.convert_chat_days_to_html(
+            chat_id=chat_id,
+            chat_messages=chat_messages,
+            chat_progress_unit=chat_progress_unit,
+            current_chat_progress=current_chat_progress,
+            html_result=html_result,
+            dates=changed_dates
+        ):
+            search = day["search"].to_dict() if day["search"] is not None else None
+            content = (f"addDay({json.dumps(day['date'])}, {json.dumps(day['html'], ensure_ascii=True)}, "
+                       f"{json.dumps(day['replies'], ensure_ascii=True)}, "
+                       f"{json.dumps(search, ensure_ascii=True, separators=(',', ':'))});\n")
+            with self.profiler.stage("write"):
+                day_pages.write_day(
+                    date=day["date"],
+                    content=content,
+                    message_count=day["messages"],
+                    fingerprint=fingerprints[day["date"]],
+                    stats=day["stats"].to_dict()
+                )
+        # days inside the synced window that no longer have any messages
+        day_pages.remove_days([
+            date for date in day_pages.get_dates_between(oldest=oldest, latest=latest) if date not in fingerprints
+        ])
+        day_pages.save_manifest()
+
+    def convert_day_pages_to_html(self, chat_name: str, chat_type: str, day_pages: DayPageStore):
+        # the container page only links the day scripts, the hash in the query string lets browsers cache them
+        yield page_head_start + f"Nana Slack | {chat_type} | {chat_name}" + page_head_end
+        for date in day_pages.get_dates():
+            yield f"""
+            <script src="./days/{date}.js?{day_pages.get_day_hash(date)[:12]}"></script>"""
+        yield page_tail_start
+        yield page_tail_end
+
+    def convert_chat_chunks_to_html(self, chat_id, chat_messages: HistorySpool, chat_progress_unit: float,
+                                    current_chat_progress: float, html_result: dict):
+        # yields one {"first_ts", "messages", "replies"} dict per virtual_chunk_size messages, each message is its own
+        # html string so the page can insert a chunk without parsing one big document
+        media_list = html_result["media"]
+        chunk = {"first_ts": None, "messages": [], "replies": {}}
+        last_date = ""
+        total_messages = len(chat_messages)
+        for message_index, message in enumerate(chat_messages):
+            if len(chunk["messages"]) == virtual_chunk_size:
+                yield chunk
+                chunk = {"first_ts": None, "messages": [], "replies": {}}
+            try:
+                message_progress_unit = chat_progress_unit * 0.4 / total_messages * (message_index + 1)
+                html_result["current_message_progress"] = current_chat_progress + message_progress_unit
+                self.update_progress(html_result["current_message_progress"])
+                self.update_status(f"Saving {message_index + 1} of {total_messages} messages...")
+                message_result = self.convert_chat_message_to_html(
+                    chat_id=chat_id,
+                    message=message,
+                    media_list=media_list,
+                    search_index=html_result["search_index"],
+                    stats=html_result["stats"]
+                )
+                html = message_result["html"]
+                if message_result["date"] != last_date:
+                    html = self.convert_date_to_html(date=message_result["date"]) + html
+                    last_date = message_result["date"]
+                chunk["first_ts"] = chunk["first_ts"] or message.ts
+                chunk["messages"].append(html)
+                if message_result["replies"]:
+                    chunk["replies"][message.ts] = message_result["replies"]
+            except Exception as e:
+                logger.exception(e)
+                logger.error({
+                    "class": self.__class__.__name__,
+                    "method": "convert_chat_chunks_to_html",
+                    "error_message": "Error converting chat messages to html",
+                    "chat_id": chat_id,
+                    "chat_message": message,
+                    "error": str(e)
+                })
+        self.media_file_names = []
+        if chunk["messages"]:
+            yield chunk
+
+    def save_chat_chunks(self, chat_id, chat_messages: HistorySpool, chat_progress_unit: float,
+                         current_chat_progress: float, html_result: dict, folder_path: str):
+        # writes chunks/{index}.js scripts and returns [first_ts, message_count, src] for each of them
+        if not self.bundle.enabled and not os.path.exists(folder_path):
+            os.makedirs(folder_path)
+        chunks = []
+        for chunk_index, chunk in enumerate(self.convert_chat_chunks_to_html(
+            chat_id=chat_id,
+            chat_messages=chat_messages,
+            chat_progress_unit=chat_progress_unit,
+            current_chat_progress=current_chat_progress,
+            html_result=html_result
+        )):
+            content = (f"addChunk({chunk_index}, {json.dumps(chunk['messages'], ensure_ascii=True)}, "
+                       f"{json.dumps(chunk['replies'], ensure_ascii=True)});\n")
+            chunk_name = f"{chunk_index:05d}.js"
+            with self.profiler.stage("write"), self.open_output(f"{folder_path}/{chunk_name}") as f:
+                f.write(content)
+            content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            chunks.append([chunk["first_ts"], len(chunk["messages"]), f"./chunks/{chunk_name}?{content_hash[:12]}"])
+        # chunks left over from an earlier export of more messages, a bundle is written from scratch every time
+        for file_name in [] if self.bundle.enabled else os.listdir(folder_path):
+            if file_name.endswith(".js") and file_name[:-3].isdigit() and int(file_name[:-3]) >= len(chunks):
+                os.remove(f"{folder_path}/{file_name}")
+        return chunks
+
+    def convert_chunk_pages_to_html(self, chat_name: str, chat_type: str, chunks: list):
+        yield page_head_start + f"Nana Slack | {chat_type} | {chat_name}" + page_head_end
+        yield f"""<div id="chunks"></div>
+            <script>initChunks({json.dumps(chunks, ensure_ascii=True)});</script>"""
+        yield page_tail_start
+        yield page_tail_end
+
+    def get_thread_replies(self, chat_id: str, message: SlackMessage):
+        replies = self.thread_cache.get(channel=chat_id, message=message)
+        if replies is None:
+            with self.profiler.stage("replies"):
+                replies = self.slack_client.get_message_replies(
+                    chat_id=chat_id,
+                    message_ts=message.ts
+                )
+            self.thread_cache.put(channel=chat_id, message=message, replies=replies)
+        return replies
+
+    def record_message(self, chat_id: str, message: SlackMessage, user_name: str, thread_ts: Optional[str] = None,
+                       search_index: Optional[SearchIndex] = None, stats: Optional[ChatStats] = None):
+        # everything besides the page that is built from the same pass over the messages
+        self.archive.add_message(chat_id=chat_id, message=message, thread_ts=thread_ts)
+        self.parquet.add_message(chat_id=chat_id, message=message, thread_ts=thread_ts)
+        if search_index is not None:
+            search_index.add_message(message=message, user_name=user_name, thread_ts=thread_ts)
+        if stats is not None:
+            stats.add_message(message=message, user_name=user_name, is_reply=thread_ts is not None)
+
+    def convert_chat_to_text(self, chat_id: str, chat_name: str, chat_type: str, chat_messages: HistorySpool,
+                             chat_progress_unit: float, current_chat_progress: float, html_result: dict):
+        # the markdown and plain text formats, streamed in chunks like the html page with threads inlined
+        text_format = self.text_format
+        text = text_format["title"].format(title=self.text_renderer.escape(f"Nana Slack | {chat_type} | {chat_name}"))
+        last_date = ""
+        total_messages = len(chat_messages)
+        for message_index, message in enumerate(chat_messages):
+            if message_index and message_index % render_chunk_size == 0:
+                yield text
+                text = ""
+            try:
+                message_progress_unit = chat_progress_unit * 0.4 / total_messages * (message_index + 1)
+                html_result["current_message_progress"] = current_chat_progress + message_progress_unit
+                self.update_progress(html_result["current_message_progress"])
+                self.update_status(f"Saving {message_index + 1} of {total_messages} messages...")
+                date = datetime.fromtimestamp(float(message.ts)).strftime("%Y-%m-%d")
+                if date != last_date:
+                    text += text_format["date"].format(date=date)
+                    last_date = date
+                text += self.convert_chat_message_to_text(
+                    chat_id=chat_id,
+                    message=message,
+                    media_list=html_result["media"],
+                    stats=html_result["stats"]
+                )
+            except Exception as e:
+                logger.exception(e)
+                logger.error({
+                    "class": self.__class__.__name__,
+                    "method": "convert_chat_to_text",
+                    "error_message": "Error converting chat messages to text",
+                    "chat_id": chat_id,
+                    "chat_message": message,
+                    "error": str(e)
+                })
+        self.media_file_names = []
+        yield text
+
+    def convert_chat_message_to_text(self, chat_id: str, message: SlackMessage, media_list: list,
+                                     stats: Optional[ChatStats] = None, thread_ts: Optional[str] = None):
+        text_format = self.text_format
+        renderer = self.text_renderer
+        user_name = self.get_user_data(user_id=message.user)["real_name"]
+        self.record_message(chat_id=chat_id, message=message, user_name=user_name, thread_ts=thread_ts, stats=stats)
+        body = renderer.render(message.text or "")
+        for attachment in message.attachments:
+            if attachment.pretext:
+                body += f"{renderer.line_break}{renderer.render(attachment.pretext)}"
+            if attachment.title:
+                body += f"{renderer.line_break}{renderer.bold[0]}{renderer.render(attachment.title)}{renderer.bold[1]}"
+            if attachment.text:
+                body += f"{renderer.line_break}{renderer.render(attachment.text)}"
+            if attachment.image_url:
+                body += f"{renderer.line_break}{renderer.render_link(url=attachment.image_url, label='')}"
+        text = text_format["message"].format(
+            user_name=renderer.escape(user_name),
+            time=datetime.fromtimestamp(float(message.ts)).strftime("%H:%M:%S" if thread_ts is None else
+                                                                     "%Y-%m-%d %H:%M:%S"),
+            body=body
+        )
+        for file in message.files:
+            if not file.url_private:
+                continue
+            file_name = self.get_media_file_name(file=file)
+            file_links = self.get_media_links(file=file, file_name=file_name, media_list=media_list)
+            text += text_format["file"].format(
+                file_name=renderer.escape(file_name),
+                href=file_links["href"],
+                note=text_format["skipped"].format(reason=file_links["skipped"]) if file_links["skipped"] else ""
+            )
+        if thread_ts is None and message.reply_count > 0:
+            try:
+                replies = self.get_thread_replies(chat_id=chat_id, message=message)
+                thread = text_format["replies"].format(count=len(replies)) + "".join(
+                    self.convert_chat_message_to_text(
+                        chat_id=chat_id,
+                        message=reply,
+                        media_list=media_list,
+                        stats=stats,
+                        thread_ts=message.ts
+                    ) for reply in replies
+                )
+                prefix = text_format["reply_prefix"]
+                text += "".join(
+                    prefix + line if line.strip() else prefix.rstrip() + line for line in thread.splitlines(True)
+                )
+            except Exception as e:
+                logger.exception(e)
+                logger.error({
+                    "class": self.__class__.__name__,
+                    "method": "convert_chat_message_to_text",
+                    "error_message": "Error getting message replies",
+                    "chat_id": chat_id,
+                    "chat_message": message,
+                    "error": str(e)
+                })
+        return text
+
+    def convert_chat_message_to_html(self, chat_id: str, message: SlackMessage, media_list: list,
+                                     search_index: Optional[SearchIndex] = None, stats: Optional[ChatStats] = None):
+        html = ""
+        replies = []
+        user_id = message.user
+        user_data = self.get_user_data(user_id=user_id)
+        user_name = user_data["real_name"]
+        message_ts = message.ts
+        timestamp = datetime.fromtimestamp(float(message_ts)).strftime("%Y-%m-%d %H:%M:%S")
+        body_result = self.render_with_cache(
+            chat_id=chat_id,
+            kind="message",
+            message=message,
+            user_name=user_name,
+            render=lambda: self.convert_message_body_to_html(
+                chat_id=chat_id,
+                message=message,
+                user_name=user_name
+            )
+        )
+        html += body_result["html"]
+        media_list.extend(body_result["media"])
+        self.record_message(chat_id=chat_id, message=message, user_name=user_name, search_index=search_index,
+                            stats=stats)
+
+        if message.reply_count > 0:
+            try:
+                # fix name of users in replies
+                for reply in self.get_thread_replies(chat_id=chat_id, message=message):
+                    try:
+                        reply_user_data = self.get_user_data(user_id=reply.user)
+                        self.record_message(chat_id=chat_id, message=reply, user_name=reply_user_data["real_name"],
+                                            thread_ts=message_ts, search_index=search_index, stats=stats)
+                        reply_result = self.render_with_cache(
+                            chat_id=chat_id,
+                            kind="reply",
+                            message=reply,
+                            user_name=reply_user_data["real_name"],
+                            render=lambda: self.convert_reply_to_html(
+                                reply=reply,
+                                user_name=reply_user_data["real_name"]
+                            )
+                        )
+                        if reply_result.get("media"):
+                            media_list.extend(reply_result.get("media"))
+                        replies.append({"ts": reply.ts, "html": reply_result.get("html")})
+                    except Exception as e:
+                        logger.exception(e)
+                        logger.error({
+                            "class": self.__class__.__name__,
+                            "method": "convert_chat_message_to_html",
+                            "error_message": "Error converting chat messages to html",
+                            "chat_id": chat_id,
+                            "chat_message": message,
+                            "error": str(e)
+                        })
+            except Exception as e:
+                logger.exception(e)
+                logger.error({
+                    "class": self.__class__.__name__,
+                    "method": "convert_chat_message_to_html",
+                    "error_message": "Error getting message replies",
+                    "chat_id": chat_id,
+                    "chat_message": message,
+                    "error": str(e)
+                })
+        if replies:
+            html += f"""
+                                <div class="timestamp"><button onclick="showReplies('{message_ts}')"
+                                        data-timestamp="{message_ts}"
+                                        class="replies-btn">{message.reply_count} replies</button>{timestamp}
+                                </div>
+                            """
+
+        html += f"""
+                            <div class="timestamp">{timestamp}</div>
+                        </div>
+                        """
+        return {"date": timestamp.split(" ")[0], "html": html, "replies": replies}
+
+    @staticmethod
+    def convert_date_to_html(date: str):
+        return f"""
+                        <div class="date">
+                            <p><bdi>{date}</bdi></p>
+                        </div>
+                        """
+
+    def render_with_cache(self, chat_id: str, kind: str, message: SlackMessage, user_name: str,
+                          render: Callable[[], dict]):
+        result = self.render_cache.get(channel=chat_id, kind=kind, message=message, user_name=user_name)
+        # the files a cached fragment downloads still go through the media policy, the byte budget depends on what
+        # else this run downloads, a fragment linking a file the policy now skips is rendered again
+        if result is not None and not any(
+            self.media_policy.check(file=SlackFile.from_dict(media["file"]))
+            for media in result["media"] if "file" in media
+        ):
+            # reserve the media names the cached fragment links to so new files do not take them
+            self.media_file_names.extend(media["file_name"] for media in result["media"])
+            return result
+        result = render()
+        self.render_cache.put(channel=chat_id, kind=kind, message=message, user_name=user_name, result=result)
+        return result
+
+    def convert_message_body_to_html(self, chat_id: str, message: SlackMessage, user_name: str):
+        media_list = []
+        html = ""
+        if message.text:
+            html += self.convert_message_to_html(message=message, user_name=user_name)
+            if message.files:
+                for file in message.files:
+                    try:
+                        if file.url_private:
+                            file_name_fixed = self.get_media_file_name(file=file)
+                            file_links = self.get_media_links(
+                                file=file,
+                                file_name=file_name_fixed,
+                                media_list=media_list
+                            )
+                            html += f"""
+                                                <p><a href="{escape_html(file_links['href'])}">{file_name_fixed}</a></p>
+                                            """
+                            if file_links["skipped"]:
+                                html += f"""
+                                                <p><em>Not downloaded: {file_links['skipped']}</em></p>
+                                            """
+                            elif file.filetype.lower() in ["mp4", "mov", "avi", "wmv", "flv", "webm", "mkv"]:
+                                html += f"""
+                                                    <video class="video" controls preload="none">
+                                                        <source src="./media/{file_name_fixed}" type="video/mp4">
+                                                        <source src="./media/{file_name_fixed}" type="video/quicktime">
+                                                        Your browser does not support the video tag.
+                                                    </video>
+                                                """
+                            elif file.filetype.lower() in ["jpg", "png", "gif", "jpeg", "bmp", "svg", "tiff",
+                                                          "tif",
+                                                          "webp", "ico", "heic", "heif", "psd", "raw"]:
+                                html += f"""
+                                            <div class="container">
+                                                <img class="img" loading="lazy" src="{file_links['src']}">
+                                            </div>
+                                        """
+                            elif file.filetype.lower() in ["mp3", "wav", "ogg", "flac", "aac", "wma", "m4a",
+                                                          "m4b", "m4p", "m4r", "m4v", "m4b"]:
+                                html += f"""
+                                                    <audio class="audio" controls preload="none">
+                                                        <source src="./media/{file_name_fixed}" type="audio/mpeg">
+                                                        Your browser does not support the audio tag.
+                                                    </audio>
+                                                """
+                        elif file.name:
+                            html += f"""
+                                                        <p><strong>{file.name}</strong></p>
+                                                    """
+                    except Exception as e:
+                        logger.exception(e)
+                        logger.error({
+                            "class": self.__class__.__name__,
+                            "method": "convert_message_body_to_html",
+                            "error_message": "Error converting file to html",
+                            "chat_id": chat_id,
+                            "error": str(e)
+                        })
+        else:
+            html += f"""
+                            <div class="message other" data-ts="{message.ts}">
+                                <p><strong><bdi>{user_name}</bdi></strong></p>
+                            """
+            if message.files:
+                for file in message.files:
+                    try:
+                        if file.url_private:
+                            file_name_fixed = self.get_media_file_name(file=file)
+                            file_links = self.get_media_links(
+                                file=file,
+                                file_name=file_name_fixed,
+                                media_list=media_list
+                            )
+                            html += f"""
+                                                <p><a href="{escape_html(file_links['href'])}">{file_name_fixed}</a></p>
+                                            """
+                            if file_links["skipped"]:
+                                html += f"""
+                                                <p><em>Not downloaded: {file_links['skipped']}</em></p>
+                                            """
+                            elif file.filetype in ["mp4", "mov", "avi", "wmv", "flv", "webm", "mkv"]:
+                                html += f"""
+                                                    <video class="video" controls preload="none">
+                                                        <source src="./media/{file_name_fixed}" type="video/mp4">
+                                                        <source src="./media/{file_name_fixed}" type="video/quicktime">
+                                                        Your browser does not support the video tag.
+                                                    </video>
+                                                """
+                            elif file.filetype in ["jpg", "png", "gif", "jpeg", "bmp", "svg", "tiff",
+                                                          "tif",
+                                                          "webp"]:
+                                html += f"""
+                                            <div class="container">
+                                                <img class="img" loading="lazy" src="{file_links['src']}">
+                                            </div>
+                                        """
+                            elif file.filetype in ["mp3", "wav", "ogg", "flac", "aac", "wma", "m4a",
+                                                          "m4b", "m4p", "m4r", "m4v", "m4b"]:
+                                html += f"""
+                                                    <audio class="audio" controls preload="none">
+                                                        <source src="./media/{file_name_fixed}" type="audio/mpeg">
+                                                        Your browser does not support the audio tag.
+                                                    </audio>
+                                                """
+                        elif file.name:
+                            html += f"""
+                                                        <p><strong>{file.name}</strong></p>
+                                                    """
+                    except Exception as e:
+                        logger.exception(e)
+                        logger.error({
+                            "class": self.__class__.__name__,
+                            "method": "convert_message_body_to_html",
+                            "error_message": "Error converting file to html",
+                            "chat_id": chat_id,
+                            "error": str(e)
+                        })
+            else:
+                html += """
+                                    <p><em>Unknown message type</em></p>
+                                """
+        return {"html": html, "media": media_list}
+
+    def convert_reply_to_html(self, reply: SlackMessage, user_name: str):
+        reply_timestamp = datetime.fromtimestamp(float(reply.ts)).strftime("%Y-%m-%d %H:%M:%S")
+        media_list = []
+        html = '<div class="message reply">'
+        if reply.text:
+            html += self.convert_message_to_html(message=reply, user_name=user_name)
+            if reply.files:
+                for file in reply.files:
+                    try:
+                        if file.url_private:
+                            file_name_fixed = self.get_media_file_name(file=file)
+                            file_links = self.get_media_links(
+                                file=file,
+                                file_name=file_name_fixed,
+                                media_list=media_list
+                            )
+                            html += f"""
+                                                        <p><a href="{escape_html(file_links['href'])}">{file_name_fixed}</a></p>
+                                                    """
+                            if file_links["skipped"]:
+                                html += f"""
+                                                <p><em>Not downloaded: {file_links['skipped']}</em></p>
+                                            """
+                            elif file.filetype in ["mp4", "mov", "avi", "wmv", "flv", "webm", "mkv"]:
+                                html += f"""
+                                                            <video class="video" controls preload="none">
+                                                                <source src="./media/{file_name_fixed}" type="video/mp4">
+                                                                <source src="./media/{file_name_fixed}" type="video/quicktime">
+                                                                Your browser does not support the video tag.
+                                                            </video>
+                                                        """
+                            elif file.filetype in ["jpg", "png", "gif", "jpeg", "bmp", "svg", "tiff", "tif",
+                                                          "webp"]:
+                                html += f"""
+                                                    <div class="container">
+                                                        <img class="img" loading="lazy" src="{file_links['src']}">
+                                                    </div>
+                                                """
+                            elif file.filetype in ["mp3", "wav", "ogg", "flac", "aac", "wma", "m4a",
+                                                          "m4b", "m4p", "m4r", "m4v", "m4b"]:
+                                html += f"""
+                                            <audio class="audio" controls preload="none">
+                                                <source src="./media/{file_name_fixed}" type="audio/mpeg">
+                                                Your browser does not support the audio tag.
+                                            </audio>
+                                        """
+                        elif file.name:
+                            html += f"""
+                                                                <p><strong>{file.name}</strong></p>
+                                                            """
+                    except Exception as e:
+                        logger.exception(e)
+                        logger.error({
+                            "class": self.__class__.__name__,
+                            "method": "convert_reply_to_html",
+                            "error_message": "Error converting reply to html",
+                            "reply": reply,
+                            "error": str(e)
+                        })
+            html += f"""
+                        <div class="timestamp">{reply_timestamp}</div>
+                    </div> </div>
+                    """
+        else:
+            html += f"""
+                                    <div class="message other" data-ts="{reply.ts}">
+                                        <p><strong><bdi>{user_name}</bdi></strong></p>
+                                    """
+            if reply.files:
+                for file in reply.files:
+                    try:
+                        if file.url_private:
+                            file_name_fixed = self.get_media_file_name(file=file)
+                            file_links = self.get_media_links(
+                                file=file,
+                                file_name=file_name_fixed,
+                                media_list=media_list
+                            )
+                            html += f"""
+                                                        <p><a href="{escape_html(file_links['href'])}">{file_name_fixed}</a></p>
+                                                    """
+                            if file_links["skipped"]:
+                                html += f"""
+                                                <p><em>Not downloaded: {file_links['skipped']}</em></p>
+                                            """
+                            elif file.filetype in ["mp4", "mov", "avi", "wmv", "flv", "webm", "mkv"]:
+                                html += f"""
+                                                            <video class="video" controls preload="none">
+                                                                <source src="./media/{file_name_fixed}" type="video/mp4">
+                                                                <source src="./media/{file_name_fixed}" type="video/quicktime">
+                                                                Your browser does not support the video tag.
+                                                            </video>
+                                                        """
+                            elif file.filetype in ["jpg", "png", "gif", "jpeg", "bmp", "svg", "tiff", "tif",
+                                                          "webp"]:
+                                html += f"""
+                                                    <div class="container">
+                                                        <img class="img" loading="lazy" src="{file_links['src']}">
+                                                    </div>
+                                                """
+                            elif file.filetype in ["mp3", "wav", "ogg", "flac", "aac", "wma", "m4a",
+                                                          "m4b", "m4p", "m4r", "m4v", "m4b"]:
+                                html += f"""
+                                            <audio class="audio" controls preload="none">
+                                                <source src="./media/{file_name_fixed}" type="audio/mpeg">
+                                                Your browser does not support the audio tag.
+                                            </audio>
+                                        """
+                        elif file.name:
+                            html += f"""
+                                                                <p><strong>{file.name}</strong></p>
+                                                            """
+                    except Exception as e:
+                        logger.exception(e)
+                        logger.error({
+                            "class": self.__class__.__name__,
+                            "method": "convert_reply_to_html",
+                            "error_message": "Error converting reply to html",
+                            "reply": reply,
+                            "error": str(e)
+                        })
+            else:
+                html += """
+                                            <p><em>Unknown message type</em></p>
+                                        """
+            html += f"""
+                                        <div class="timestamp">{reply_timestamp}</div>
+                                    </div></div>
+                                    """
+        return {"html": html, "media": media_list.copy()}
+
+    def get_media_file_name(self, file: SlackFile):
+        # a file keeps the name it was first given, so files shared in several messages are saved once and
+        # re-exports keep linking the same names
+        if file.id and file.id in self.media_names:
+            file_name_fixed = self.media_names[file.id]
+        else:
+            file_name_fixed = self.fix_file_name(file_name=file.name)
+            if file.id:
+                self.media_names[file.id] = file_name_fixed
+        self.media_file_names.append(file_name_fixed)
+        return file_name_fixed
+
+    def get_media_links(self, file: SlackFile, file_name: str, media_list: list):
+        # queues the downloads a file needs and returns where the page links it and where it shows it inline
+        file_links = {"href": f"./media/{file_name}", "src": f"./media/{file_name}", "skipped": None}
+        thumbnail_url = None
+        if self.media_mode != "original":
+            thumbnail_url = getattr(file, f"thumb_{self.thumbnail_size}") or file.thumb_720 or file.thumb_360
+        if thumbnail_url:
+            file_links["src"] = f"./media/thumb_{file_name}"
+            media_list.append({"file_name": f"thumb_{file_name}", "file_url": thumbnail_url})
+        if thumbnail_url and self.media_mode == "thumbnails_only":
+            skip_reason = "thumbnails only"
+        else:
+            skip_reason = self.media_policy.check(file=file)
+        if skip_reason:
+            # the original stays on slack and opens from there, the url is escaped by the html template only
+            file_links["href"] = file.url_private
+            if not thumbnail_url:
+                file_links["skipped"] = skip_reason
+            return file_links
+        media_list.append({"file_name": file_name, "file_url": file.url_private, "file": file.to_dict()})
+        return file_links
+
+    def fix_file_name(self, file_name):
+        file_name_fixed = file_name.replace("<", "").replace(">", "").replace(":", "").replace("?",
+                                                                                               "").replace(
+            "/", "").replace("\\", "").replace("*", "").replace("|", "").replace('"', "")
+        parts = file_name_fixed.rsplit(".", 1)
+        if len(parts) == 1:
+            return file_name_fixed
+        new_file_name = parts[0].replace(".", "_")
+        count = 1
+        while f"{new_file_name}{count}.{parts[1]}" in self.media_file_names:
+            count += 1
+        file_name_fixed = f"{new_file_name}{count}.{parts[1]}"
+        return file_name_fixed
+
+    def convert_message_to_html(self, message: SlackMessage, user_name: str):
+        html = f"""
+                                    <div class="message other" data-ts="{message.ts}">
+                                        <p><strong><bdi>{user_name}</bdi></strong></p>
+                                        {self.mrkdwn_renderer.render(message.text)}
+                                    """
+        if attachments := message.attachments:
+            for attachment in attachments:
+                html += f"  <p><em><bdi>{self.mrkdwn_renderer.render_inline(attachment.pretext or '')}</bdi></em></p>"
+                if attachment.title:
+                    html += f"  <p><strong><bdi>{self.mrkdwn_renderer.render_inline(attachment.title)}</bdi></strong></p>"
+                if attachment.text:
+                    html += self.mrkdwn_renderer.render(attachment.text)
+                if image_url := attachment.image_url:
+                    image_url = escape_html(image_url)
+                    html += f"""
+                                                <p><img class="img" loading="lazy" src="{image_url}"></p>
+                                            """
+        return html
+
+    def open_output(self, path: str):
+        # pages and scripts go into the bundle when one is written, otherwise into files under the export folder
+        if self.bundle.enabled:
+            return self.bundle.open(path=path)
+        return open(path, "w", encoding="utf-8")
+
+    def output_exists(self, path: str):
+        return self.bundle.contains(path=path) if self.bundle.enabled else os.path.exists(path)
+
+    def save_page_assets(self, save_path: str):
+        # every page in the export root links the same versioned stylesheet and script, they are only written once
+        assets_path = f"{save_path}/assets"
+        if not self.bundle.enabled and not os.path.exists(assets_path):
+            os.makedirs(assets_path)
+        for extension, content in (("css", page_style), ("js", page_script)):
+            asset_path = f"{assets_path}/{assets_name}.{extension}"
+            if not self.output_exists(asset_path):
+                with self.open_output(asset_path) as f:
+                    f.write(content)
+
+    def save_search_index(self, search_index: SearchIndex, folder_path: str):
+        try:
+            with self.profiler.stage("write"), self.open_output(f"{folder_path}/search.js") as f:
+                f.write(search_index.to_script())
+        except Exception as e:
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "save_search_index",
+                "error_message": "Error saving search index",
+                "folder_path": folder_path,
+                "error": str(e)
+            })
+
+    def get_page_file_name(self, chat_name: str, chat_type: str):
+        extension = self.text_format["extension"] if self.text_format else "html"
+        return f"Nana Slack - {chat_type} - {chat_name}.{extension}".replace("<", "").replace(">", "").replace(
+            ":", "").replace("?", "").replace("/", "").replace("\\", "").replace("*", "").replace("|", "").replace(
+            '"', "")
+
+    def save_chat_stats(self, chat_id: str, chat_name: str, chat_type: str, stats: ChatStats, folder_path: str):
+        # kept next to the page so the workspace index can list the chat without reading its messages
+        chat = {
+            "chat_id": chat_id,
+            "chat_name": chat_name,
+            "chat_type": chat_type,
+            "page": self.get_page_file_name(chat_name=chat_name, chat_type=chat_type),
+            "stats": stats.to_dict()
+        }
+        if self.bundle.enabled:
+            self.bundle_chats.append({**chat, "folder": os.path.basename(folder_path)})
+        try:
+            with self.open_output(f"{folder_path}/stats.json") as f:
+                json.dump(chat, f)
+        except Exception as e:
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "save_chat_stats",
+                "error_message": "Error saving chat stats",
+                "chat_name": chat_name,
+                "error": str(e)
+            })
+
+    def save_workspace_index(self, save_path: str):
+        # one index.html in the export root listing every chat exported into it, from the stats each export left
+        if self.bundle.enabled and self.bundle.per_chat:
+            logger.info("Each chat was saved into its own bundle, no workspace index to save.")
+            return
+        chats = [{**chat, "stats": ChatStats.from_dict(chat["stats"])} for chat in self.bundle_chats]
+        for folder_name in [] if self.bundle.enabled else sorted(os.listdir(save_path)):
+            stats_path = f"{save_path}/{folder_name}/stats.json"
+            if not os.path.isfile(stats_path):
+                continue
+            try:
+                with open(stats_path, "r", encoding="utf-8") as f:
+                    chat = json.load(f)
+                chat["folder"] = folder_name
+                chat["stats"] = ChatStats.from_dict(chat["stats"])
+                chats.append(chat)
+            except (ValueError, KeyError) as e:
+                logger.error({
+                    "class": self.__class__.__name__,
+                    "method": "save_workspace_index",
+                    "error_message": "Error reading chat stats, leaving the chat out of the index",
+                    "stats_path": stats_path,
+                    "error": str(e)
+                })
+        chats.sort(key=lambda chat: float(chat["stats"].last_ts or 0), reverse=True)
+        workspace_stats = ChatStats()
+        for chat in chats:
+            workspace_stats.merge(chat["stats"])
+        self.save_page_assets(save_path=save_path)
+        with self.open_output(f"{save_path}/index.html") as f:
+            f.write(index_head)
+            f.write(f"""
+            <h2>Workspace</h2>
+            <p>{len(chats)} chats, {workspace_stats.messages} messages, {workspace_stats.replies} thread replies,
+                {format_byte_size(workspace_stats.media_bytes)} of media, last activity
+                {format_timestamp(workspace_stats.last_ts)}</p>
+            <p>Top posters: {self.convert_posters_to_html(stats=workspace_stats, count=10)}</p>
+            {self.convert_month_counts_to_html(stats=workspace_stats)}
+            <table class="index-table">
+                <tr>
+                    <th>Chat</th><th>Messages</th><th>Replies</th><th>Media</th><th>Last activity</th>
+                    <th>Top posters</th><th>Messages per month</th>
+                </tr>""")
+            for chat in chats:
+                stats = chat["stats"]
+                f.write(f"""
+                <tr>
+                    <td><a href="./{quote(chat['folder'])}/{quote(chat['page'])}"><bdi>{escape_html(chat['chat_name'])}</bdi></a>
+                        <div class="timestamp">{escape_html(chat['chat_type'])}</div></td>
+                    <td>{stats.messages}</td>
+                    <td>{stats.replies}</td>
+                    <td>{format_byte_size(stats.media_bytes)}</td>
+                    <td>{format_timestamp(stats.last_ts)}</td>
+                    <td>{self.convert_posters_to_html(stats=stats, count=3)}</td>
+                    <td>{self.convert_month_counts_to_html(stats=stats)}</td>
+                </tr>""")
+            f.write("""
+            </table>""")
+            f.write(index_tail)
+        logger.info(f"Workspace index of {len(chats)} chats saved to {save_path}/index.html")
+
+    @staticmethod
+    def convert_posters_to_html(stats: ChatStats, count: int):
+        return ", ".join(
+            f"<bdi>{escape_html(user_name)}</bdi> ({posts})"
+            for user_name, posts in stats.get_top_posters(count=count)
+        )
+
+    @staticmethod
+    def convert_month_counts_to_html(stats: ChatStats):
+        month_counts = stats.get_month_counts()
+        most_posts = max((posts for _, posts in month_counts), default=0)
+        bars = "".join(
+            f'<span style="height: {posts * 100 // most_posts}%" title="{month}: {posts}"></span>'
+            for month, posts in month_counts
+        )
+        return f'<div class="month-bars">{bars}</div>'
+
+    def save_chat_to_file(self, chat_name: str, chat_type: str, html_content: Iterable[str], folder_path: str):
+        try:
+            html_filename = self.get_page_file_name(chat_name=chat_name, chat_type=chat_type)
+            with self.open_output(f"{folder_path}/{html_filename}") as f:
+                for html_chunk in html_content:
+                    with self.profiler.stage("write"):
+                        f.write(html_chunk)
+        except Exception as e:
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "save_chat_to_file",
+                "error_message": "Error saving chat to file",
+                "chat_name": chat_name,
+                "chat_type": chat_type,
+                "error": str(e)
+            })
+
+    def save_chat_media(self, chat_name: str, chat_type: str, media: list, media_folder_path: str,
+                        chat_progress_unit: float, current_html_progress: float):
+        try:
+            if media:
+                for file_index, file in enumerate(media):
+                    try:
+                        file_name = file["file_name"].replace("<", "").replace(">", "").replace(":", "").replace("?",
+                                                                                                                 "").replace(
+                            "/", "").replace("\\", "").replace("*", "").replace("|", "").replace('"', "")
+                        media_progress_unit = chat_progress_unit * 0.5 / len(media) * (file_index + 1)
+                        current_media_progress = current_html_progress + media_progress_unit
+
+                        def update_download_status(file_unit: str):
+                            logger.info(f"Downloading file {file_index + 1} of {len(media)}: {file_name} {file_unit}...")
+                            self.update_status(f"Downloading file {file_index + 1} of {len(media)}: {file_name} "
+                                               f"{file_unit}...")
+
+                        self.download_media_file(
+                            file_name=file_name,
+                            file_url=file["file_url"],
+                            media_folder_path=media_folder_path,
+                            status_callback=update_download_status
+                        )
+                        self.update_progress(current_media_progress)
+                    except Exception as e:
+                        logger.exception(e)
+                        logger.error({
+                            "class": self.__class__.__name__,
+                            "method": "save_chat_media",
+                            "error_message": "Error saving chat media",
+                            "chat_name": chat_name,
+                            "chat_type": chat_type,
+                            "error": str(e)
+                        })
+                logger.info("Download all media is complete!")
+        except Exception as e:
+            logger.exception(e)
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "save_chat_media",
+                "error_message": "Error saving chat media",
+                "chat_name": chat_name,
+                "chat_type": chat_type,
+                "error": str(e)
+            })
+
+    def download_media_file(self, file_name: str, file_url: str, media_folder_path: str,
+                            status_callback: Optional[Callable[[str], None]] = None):
+        # only media downloads need these, so they are not imported for text-only exports
+        import humanize
+        import requests
+
+        media_file_path = f"{media_folder_path}/{file_name}"
+        # check if file does not exists already in the directory
+        if self.output_exists(media_file_path):
+            return
+        # with a bundle the file is downloaded into its staging folder and moved into the bundle once complete
+        download_path = self.bundle.get_staging_path(media_file_path) if self.bundle.enabled else media_file_path
+        media_start = self.tracer.now()
+        headers = {
+            "Authorization": f"Bearer {self.token}"
+        }
+        header_response = requests.head(file_url, headers=headers, allow_redirects=True)
+        file_size = int(header_response.headers.get('Content-Length', 0))
+        file_unit = humanize.naturalsize(file_size)
+        if status_callback:
+            status_callback(file_unit)
+        else:
+            logger.info(f"Downloading file {file_name} {file_unit}...")
+        file_hash = None
+        if (self.segment_count > 1 and file_size >= self.segment_threshold
+                and header_response.headers.get("Accept-Ranges", "").lower() == "bytes"):
+            file_hash = self.download_media_segments(
+                file_url=header_response.url or file_url,
+                headers=headers,
+                part_path=f"{download_path}.part",
+                file_size=file_size
+            )
+        if not file_hash:
+            # streamed in chunks so the scheduler can pace the download and let api calls go first, a partial
+            # file is never left under the final name where the next export would take it as already saved
+            with requests.get(file_url, headers=headers, stream=True) as response, \
+                    open(f"{download_path}.part", 'wb') as f:
+                for chunk in response.iter_content(chunk_size=media_chunk_size):
+                    self.scheduler.throttle_media(len(chunk))
+                    f.write(chunk)
+        os.replace(f"{download_path}.part", download_path)
+        if self.bundle.enabled:
+            self.bundle.add_file(path=media_file_path, source_path=download_path)
+        self.tracer.record("media file", "media", start=media_start, file_name=file_name, size=file_size,
+                           segments=self.segment_count if file_hash else 1, sha256=file_hash)
+
+    def download_media_segments(self, file_url: str, headers: dict, part_path: str, file_size: int):
+        # fetches a large file as concurrent Range requests into a preallocated file, returns its sha256 once
+        # every segment arrived complete, or None so the caller falls back to a single stream
+        import requests
+
+        with open(part_path, "wb") as f:
+            f.truncate(file_size)
+        segment_size = -(-file_size // self.segment_count)
+        segments = [
+            (start, min(start + segment_size, file_size) - 1) for start in range(0, file_size, segment_size)
+        ]
+
+        def download_segment(segment_index: int, start: int, end: int):
+            # profiled on the segment thread, the stage waiting for the file only sees the wait
+            with self.profiler.worker_stage("media segments"):
+                segment_start = self.tracer.now()
+                received = 0
+                range_headers = {**headers, "Range": f"bytes={start}-{end}"}
+                with requests.get(file_url, headers=range_headers, stream=True) as response:
+                    if response.status_code != 206:
+                        return False
+                    with open(part_path, "r+b") as f:
+                        f.seek(start)
+                        for chunk in response.iter_content(chunk_size=media_chunk_size):
+                            self.scheduler.throttle_media(len(chunk))
+                            # a server ignoring the end of the range must not spill into the next segment
+                            f.write(chunk[:max(end + 1 - start - received, 0)])
+                            received += len(chunk)
+                self.tracer.record("media segment", "media", start=segment_start, segment=segment_index, size=received)
+                return received == end + 1 - start
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(segments), thread_name_prefix="segment") as executor:
+                complete = all(executor.map(lambda segment: download_segment(*segment), [
+                    (segment_index, start, end) for segment_index, (start, end) in enumerate(segments)
+                ]))
+        except requests.RequestException as e:
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "download_media_segments",
+                "error_message": "Error downloading file segments, downloading it in one stream.",
+                "file_url": file_url,
+                "error": str(e)
+            })
+            complete = False
+        if not complete:
+            return None
+        file_hash = hashlib.sha256()
+        with open(part_path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    def prefetch_chat_media(self, chat_id: str, media_folder_path: str, oldest: Optional[str] = None,
+                            latest: Optional[str] = None):
+        # lists the chat's files up front so they download while the messages are rendered, returns the
+        # downloads by file name
+        downloads = {}
+        media_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="media")
+        with self.profiler.stage("inventory"):
+            files = [
+                file for file in self.slack_client.iter_chat_files(chat_id=chat_id, ts_from=oldest, ts_to=latest)
+                if file.url_private and file.name
+            ]
+            self.media_policy.plan_chat(files=files)
+            for file in files:
+                file_media = []
+                self.get_media_links(file=file, file_name=self.get_media_file_name(file=file), media_list=file_media)
+                for media in file_media:
+                    if media["file_name"] in downloads:
+                        continue
+                    downloads[media["file_name"]] = media_executor.submit(
+                        self.prefetch_media_file,
+                        file_name=media["file_name"],
+                        file_url=media["file_url"],
+                        media_folder_path=media_folder_path
+                    )
+        media_executor.shutdown(wait=False)
+        logger.info(f"Found {len(downloads)} files to download in {chat_id}.")
+        return downloads
+
+    def prefetch_media_file(self, file_name: str, file_url: str, media_folder_path: str):
+        try:
+            # profiled on the media thread, the media stage only sees the wait for the prefetched files
+            with self.profiler.worker_stage("media downloads"):
+                self.download_media_file(file_name=file_name, file_url=file_url, media_folder_path=media_folder_path)
+        except Exception as e:
+            logger.exception(e)
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "prefetch_media_file",
+                "error_message": "Error saving chat media",
+                "file_name": file_name,
+                "error": str(e)
+            })
+
+    def finish_chat_media(self, chat_name: str, chat_type: str, media: list, downloads: dict,
+                          media_folder_path: str, chat_progress_unit: float, current_html_progress: float):
+        # waits for the prefetched files, then downloads the files only found while rendering
+        media = list({
+            file["file_name"]: file for file in media if file["file_name"] not in downloads
+        }.values())
+        media_total = len(downloads) + len(media)
+        if not media_total:
+            return
+        for file_index, download in enumerate(downloads.values()):
+            self.update_status(f"Downloading file {file_index + 1} of {media_total}...")
+            download.result()
+            self.update_progress(current_html_progress + chat_progress_unit * 0.5 / media_total * (file_index + 1))
+        self.save_chat_media(
+            chat_name=chat_name,
+            chat_type=chat_type,
+            media=media,
+            chat_progress_unit=chat_progress_unit * len(media) / media_total,
+            current_html_progress=current_html_progress + chat_progress_unit * 0.5 * len(downloads) / media_total,
+            media_folder_path=media_folder_path
+        )
+
+
+page_style = """
+body {
+background-color: #232931;
+color: #fff;
+font-family: Arial, sans-serif;
+font-size: 16px;
+}
+.container {
+margin-top: 30px;
+margin-bottom: 30px;
+max-width: 95%;
+margin-left: auto;
+margin-right: auto;
+background-color: #393E46;
+padding: 20px;
+border-radius: 10px;
+box-shadow: 0 0 10px rgba(0, 0, 0, 0.3);
+height: auto;
+clear: both; /* added this line to clear any floats */
+overflow: auto; /* added this line to show a scrollbar if necessary */
+}
+.message {
+padding: 10px;
+max-width: 780px;
+margin-bottom: 10px;
+border-radius: 5px;
+clear: both;
+}
+.message.me {
+background-color: #1c1c1c;
+float: right;
+}
+.message.other {
+background-color: #1c1c1c;
+float: left;
+}
+.message.reply {
+background-color: #1c1c1c;
+float: left;
+border: 1px solid #ccc;
+margin-top: 10px;
+}
+.message.me p, .message.other p, .message.reply p {
+margin: 0;
+font-size: 14px;
+line-height: 1.5;
+word-wrap: break-word;
+}
+.timestamp {
+font-size: 12px;
+color: #999;
+margin-top: 5px;
+margin-left: 5px;
+}
+.code-block {
+background-color: #383838;
+border: 1px solid #9c9c9c;
+border-radius: 5px;
+margin: 10px 0;
+padding: 10px;
+clear: both; /* added this line to clear any floats */
+overflow: auto; /* added this line to show a scrollbar if necessary */
+}
+.code-block pre {
+margin: 0;
+float: left;
+}
+.img {
+max-width: 100%;
+max-height: 400px;
+height: auto;
+}
+.video {
+max-width: 100%;
+max-height: 400px;
+height: auto;
+}
+.mention {
+color: #00a6ff;
+}
+.quote {
+display: block;
+border-left: 3px solid #999;
+padding-left: 8px;
+}
+code {
+background-color: #383838;
+border-radius: 3px;
+padding: 0 3px;
+}
+.replies-btn {
+background-color: transparent;
+color: #00a6ff;
+border: none;
+font-size: 12px;
+cursor: pointer;
+}
+.replies-btn:hover {
+text-decoration: underline;
+}
+.date {
+    display: block;
+    width: 100%;
+    margin-top: 10px;
+    overflow: hidden;
+    text-align: center;
+    color: #999;
+}
+
+.date::after {
+    content: "";
+    display: inline-block;
+    width: 100%;
+    height: 1px;
+    margin-bottom: 10px;
+    background-color: #999;
+}
+.search {
+max-width: 95%;
+margin: 30px auto 0;
+}
+.search input {
+width: 100%;
+box-sizing: border-box;
+padding: 8px 10px;
+border: 1px solid #999;
+border-radius: 5px;
+background-color: #1c1c1c;
+color: #fff;
+font-size: 14px;
+}
+.search-results {
+max-height: 300px;
+overflow: auto;
+}
+.search-result {
+padding: 6px 10px;
+font-size: 14px;
+cursor: pointer;
+border-bottom: 1px solid #393E46;
+}
+.search-result:hover {
+background-color: #393E46;
+}
+.search-hit {
+outline: 2px solid #00a6ff;
+}
+.index-table {
+width: 100%;
+border-collapse: collapse;
+font-size: 14px;
+}
+.index-table th, .index-table td {
+text-align: left;
+padding: 6px 8px;
+border-bottom: 1px solid #232931;
+}
+.index-table a {
+color: #00a6ff;
+}
+.month-bars {
+display: flex;
+align-items: flex-end;
+height: 30px;
+gap: 1px;
+margin: 5px 0;
+}
+.month-bars span {
+width: 4px;
+min-height: 1px;
+background-color: #00a6ff;
+}
+/* Media queries */
+@media (max-width: 800px) {
+.container {
+max-width: 90%;
+}
+}
+@media (max-width: 600px) {
+.message {
+max-width: 95%;
+}
+}
+"""
+
+page_script = """
+var searchIndexes = [];
+var replies = {};
+var chunks = [];
+var chunkViews = [];
+var chunkStates = [];
+var chunkCallbacks = [];
+function addSearchIndex(index) {
+    searchIndexes.push(index);
+}
+function addDay(date, html, dayReplies, daySearchIndex) {
+    document.currentScript.insertAdjacentHTML("beforebegin", html);
+    Object.assign(replies, dayReplies);
+    if (daySearchIndex) {
+        addSearchIndex(daySearchIndex);
+    }
+}
+function initChunks(chunkList) {
+    // [first_ts, message_count, src] per chunk, chunks are loaded when they come near the viewport and emptied
+    // again once they scroll far away, so the dom only ever holds a few of them
+    chunks = chunkList;
+    var chunkObserver = new IntersectionObserver(function (entries) {
+        for (const entry of entries) {
+            var index = Number(entry.target.dataset.chunk);
+            if (entry.isIntersecting) {
+                loadChunk(index);
+            } else {
+                unloadChunk(index);
+            }
+        }
+    }, {rootMargin: "1500px 0px"});
+    chunks.forEach(function (chunk, index) {
+        var view = document.createElement("div");
+        view.style.display = "flow-root";
+        view.style.height = (chunk[1] * 90) + "px";
+        view.dataset.chunk = index;
+        document.getElementById("chunks").appendChild(view);
+        chunkViews.push(view);
+        chunkStates.push("empty");
+        chunkCallbacks.push([]);
+        chunkObserver.observe(view);
+    });
+}
+function loadChunk(index, callback) {
+    if (callback) {
+        chunkCallbacks[index].push(callback);
+    }
+    if (chunkStates[index] === "shown") {
+        runChunkCallbacks(index);
+    } else if (chunkStates[index] === "empty") {
+        chunkStates[index] = "loading";
+        var script = document.createElement("script");
+        script.src = chunks[index][2];
+        document.head.appendChild(script);
+    }
+}
+function addChunk(index, messages, chunkReplies) {
+    document.currentScript.remove();
+    Object.assign(replies, chunkReplies);
+    if (chunkStates[index] !== "loading") {
+        return;
+    }
+    chunkViews[index].innerHTML = messages.join("");
+    chunkViews[index].style.height = "";
+    chunkStates[index] = "shown";
+    runChunkCallbacks(index);
+}
+function unloadChunk(index) {
+    if (chunkStates[index] === "shown") {
+        // keep the rendered height so the scroll position does not jump
+        chunkViews[index].style.height = chunkViews[index].offsetHeight + "px";
+        chunkViews[index].innerHTML = "";
+    }
+    chunkStates[index] = "empty";
+}
+function runChunkCallbacks(index) {
+    var callbacks = chunkCallbacks[index];
+    chunkCallbacks[index] = [];
+    for (const callback of callbacks) {
+        callback();
+    }
+}
+function loadMessage(ts, callback) {
+    // the chunk holding ts is the last one starting at or before it
+    if (!chunks.length) {
+        return;
+    }
+    var index = 0;
+    while (index + 1 < chunks.length && parseFloat(chunks[index + 1][0]) <= parseFloat(ts)) {
+        index++;
+    }
+    chunkViews[index].scrollIntoView();
+    loadChunk(index, callback);
+}
+function showReplies(timestamp) {
+    var repliesHtml = '';
+    for (const element of replies[timestamp]) {
+        repliesHtml += element.html;
+    }
+    var parentContainer = document.querySelector(`button[data-timestamp="${timestamp}"]`).parentNode;
+    var repliesContainer = document.createElement('div');
+    repliesContainer.classList.add('replies-container');
+    repliesContainer.innerHTML = repliesHtml;
+    repliesContainer.setAttribute('data-timestamp', timestamp);
+    parentContainer.parentNode.insertBefore(repliesContainer, parentContainer.nextSibling);
+    parentContainer.removeChild(parentContainer.querySelector(`button[data-timestamp="${timestamp}"]`));
+}
+var searchIndexRequested = false;
+function loadSearchIndex() {
+    // the single page index is a side file that is only loaded once search is used
+    if (searchIndexRequested || searchIndexes.length) {
+        return;
+    }
+    searchIndexRequested = true;
+    var script = document.createElement('script');
+    script.src = './search.js';
+    script.onload = function () {
+        search(document.getElementById('search-input').value);
+    };
+    script.onerror = function () {
+        document.getElementById('search-results').textContent = 'No search index was exported with this chat.';
+    };
+    document.head.appendChild(script);
+}
+function searchIndex(index, terms) {
+    // every term has to match the start of a token, posting lists are stored as gaps between ids
+    var matches = null;
+    for (const term of terms) {
+        var termMatches = new Set();
+        for (const token in index.tokens) {
+            if (token.startsWith(term)) {
+                var documentId = 0;
+                for (const gap of index.tokens[token]) {
+                    documentId += gap;
+                    termMatches.add(documentId);
+                }
+            }
+        }
+        matches = matches === null ? termMatches : new Set([...matches].filter(id => termMatches.has(id)));
+        if (!matches.size) {
+            break;
+        }
+    }
+    return [...(matches || [])].map(id => index.docs[id]);
+}
+function search(query) {
+    var resultsContainer = document.getElementById('search-results');
+    resultsContainer.innerHTML = '';
+    var terms = query.toLowerCase().match(/[\\p{L}\\p{N}_]+/gu) || [];
+    if (!terms.length) {
+        return;
+    }
+    var results = [];
+    for (const index of searchIndexes) {
+        results.push(...searchIndex(index, terms));
+    }
+    results.sort((a, b) => parseFloat(a[0]) - parseFloat(b[0]));
+    for (const [ts, threadTs, userName, snippet] of results.slice(0, 100)) {
+        var result = document.createElement('div');
+        result.classList.add('search-result');
+        result.textContent = `${new Date(parseFloat(ts) * 1000).toLocaleString()} ${userName}: ${snippet}`;
+        result.onclick = () => openSearchResult(ts, threadTs);
+        resultsContainer.appendChild(result);
+    }
+    if (results.length > 100) {
+        var more = document.createElement('div');
+        more.classList.add('search-result');
+        more.textContent = `${results.length - 100} more matches, refine the search to see them`;
+        resultsContainer.appendChild(more);
+    }
+}
+function openSearchResult(ts, threadTs) {
+    // the virtual layout first has to load the chunk holding the message or its thread
+    if (chunks.length) {
+        loadMessage(threadTs || ts, () => showSearchResult(ts, threadTs));
+    } else {
+        showSearchResult(ts, threadTs);
+    }
+}
+function showSearchResult(ts, threadTs) {
+    if (threadTs && document.querySelector(`button[data-timestamp="${threadTs}"]`)) {
+        showReplies(threadTs);
+    }
+    var message = document.querySelector(`.message[data-ts="${ts}"]`);
+    if (message) {
+        message.scrollIntoView({block: 'center'});
+        message.classList.add('search-hit');
+        setTimeout(() => message.classList.remove('search-hit'), 2000);
+    }
+}
+"""
+
+html_template = """
+<!DOCTYPE html>
+<html>
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>PLACE_PAGE_TITLE_HERE</title>
+        <link rel="stylesheet" href="../assets/PLACE_ASSETS_NAME_HERE.css">
+        <script src="../assets/PLACE_ASSETS_NAME_HERE.js"></script>
+    </head>
+    <body>
+        <div class="search">
+            <input id="search-input" type="search" placeholder="Search messages and thread replies"
+                   onfocus="loadSearchIndex()" oninput="search(this.value)">
+            <div id="search-results" class="search-results"></div>
+        </div>
+        <div class="container">
+            PLACE_MESSAGES_HERE
+        </div>
+        PLACE_REPLIES_HERE
+    </body>
+</html>
+"""
+
+index_template = """
+<!DOCTYPE html>
+<html>
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Nana Slack | Workspace</title>
+        <link rel="stylesheet" href="./assets/PLACE_ASSETS_NAME_HERE.css">
+    </head>
+    <body>
+        <div class="container">
+            PLACE_CHATS_HERE
+        </div>
+    </body>
+</html>
+"""
+
+
+def format_byte_size(byte_count: int):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if byte_count < 1000:
+            return f"{byte_count:.0f} {unit}" if unit == "B" else f"{byte_count:.1f} {unit}"
+        byte_count /= 1000
+    return f"{byte_count:.1f} TB"
+
+
+def format_timestamp(ts: Optional[str]):
+    return datetime.fromtimestamp(float(ts)).strftime("%Y-%m-%d %H:%M") if ts else "never"
+
+
+# the content hash in the asset file names lets every page of an export root share them and browsers cache them
+assets_name = f"nana-slack-{hashlib.sha256((page_style + page_script).encode('utf-8')).hexdigest()[:12]}"
+
+# the template is split once per process, pages are written as these static segments around their own content
+page_head, page_tail = html_template.replace("PLACE_ASSETS_NAME_HERE", assets_name).split("PLACE_MESSAGES_HERE")
+page_head_start, page_head_end = page_head.split("PLACE_PAGE_TITLE_HERE")
+page_tail_start, page_tail_end = page_tail.split("PLACE_REPLIES_HERE")
+index_head, index_tail = index_template.replace("PLACE_ASSETS_NAME_HERE", assets_name).split("PLACE_CHATS_HERE")
@@ -0,0 +1,61 @@
+import json
+import os
+import shutil
+import tempfile
+from typing import Iterable, List, Optional
+
+from libraries.models import SlackMessage
+
+
+class HistorySpool:
+    # conversations.history returns the newest page first, so pages are spilled to disk as they arrive and read back
+    # in reverse to give chronological order without keeping the whole history in memory
+    def __init__(self, folder_path: Optional[str] = None):
+        self.folder_path = tempfile.mkdtemp(prefix="slack-history-", dir=folder_path)
+        # (shard_index, page_index) of every spilled page, shard 0 holds the newest messages
+        self.pages = []
+        self.shard_page_counts = {}
+        self.message_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.message_count
+
+    def __iter__(self):
+        for shard_index, page_index in sorted(self.pages, reverse=True):
+            with open(self.get_page_path(shard_index, page_index), "r", encoding="utf-8") as f:
+                messages = json.load(f)
+            for message in reversed(messages):
+                yield SlackMessage.from_dict(message)
+
+    def get_page_path(self, shard_index: int, page_index: int):
+        return os.path.join(self.folder_path, f"page_{shard_index:04d}_{page_index:06d}.json")
+
+    def add_page(self, messages: List[SlackMessage], shard_index: int = 0):
+        page_index = self.shard_page_counts.get(shard_index, 0)
+        with open(self.get_page_path(shard_index, page_index), "w", encoding="utf-8") as f:
+            json.dump([message.to_dict() for message in messages], f)
+        self.shard_page_counts[shard_index] = page_index + 1
+        self.pages.append((shard_index, page_index))
+        self.message_count += len(messages)
+
+    def extend(self, pages: Iterable[list]):
+        for page in pages:
+            self.add_page(page)
+        return self
+
+    def extend_shards(self, shard_pages: Iterable[tuple]):
+        for shard_index, page in shard_pages:
+            self.add_page(page, shard_index=shard_index)
+        return self
+
+    def close(self):
+        shutil.rmtree(self.folder_path, ignore_errors=True)
+        self.pages = []
+        self.shard_page_counts = {}
+        self.message_count = 0
@@ -0,0 +1,118 @@
+import logging
+from typing import Iterable, Optional
+
+from libraries.models import SlackFile
+
+logger = logging.getLogger(__name__)
+
+# files at least this large are downloaded as parallel range requests, 64MB in the units --segment-threshold takes
+default_segment_threshold = 64 * 1000 ** 2
+
+
+class MediaPolicy:
+    # decides before download which files are saved, types match a filetype ("mp4"), a mimetype ("video/mp4")
+    # or a mimetype family ("video/*")
+    def __init__(self, max_file_size: Optional[int] = None, allowed_types: Optional[Iterable[str]] = None,
+                 denied_types: Optional[Iterable[str]] = None, chat_byte_budget: Optional[int] = None,
+                 run_byte_budget: Optional[int] = None):
+        self.max_file_size = max_file_size
+        self.allowed_types = {file_type.lower() for file_type in allowed_types or []}
+        self.denied_types = {file_type.lower() for file_type in denied_types or []}
+        self.chat_byte_budget = chat_byte_budget
+        self.run_byte_budget = run_byte_budget
+        self.decisions = {}
+        self.chat_bytes = 0
+        self.run_bytes = 0
+        self.skipped_files = 0
+        self.skipped_bytes = 0
+
+    def get_signature(self):
+        return (f"{self.max_file_size}|{','.join(sorted(self.allowed_types))}|{','.join(sorted(self.denied_types))}|"
+                f"{self.chat_byte_budget}|{self.run_byte_budget}")
+
+    def start_chat(self):
+        self.decisions = {}
+        self.chat_bytes = 0
+        self.skipped_files = 0
+        self.skipped_bytes = 0
+
+    def get_remaining_bytes(self):
+        remaining = [
+            budget - used for budget, used in ((self.chat_byte_budget, self.chat_bytes),
+                                               (self.run_byte_budget, self.run_bytes))
+            if budget is not None
+        ]
+        return min(remaining) if remaining else None
+
+    @staticmethod
+    def matches(file: SlackFile, file_types: set):
+        mimetype = (file.mimetype or "").lower()
+        return bool(
+            (file.filetype or "").lower() in file_types
+            or mimetype in file_types
+            or (mimetype and f"{mimetype.split('/')[0]}/*" in file_types)
+        )
+
+    def get_rule_skip_reason(self, file: SlackFile):
+        if self.allowed_types and not self.matches(file=file, file_types=self.allowed_types):
+            return "type not allowed"
+        if self.denied_types and self.matches(file=file, file_types=self.denied_types):
+            return "type denied"
+        if self.max_file_size is not None and file.size > self.max_file_size:
+            return "over size limit"
+        return None
+
+    def plan_chat(self, files: Iterable[SlackFile]):
+        # applies the rules to a chat's whole file inventory, then fits it into the byte budget by skipping the
+        # largest files first so as many files as possible are kept
+        candidates = {}
+        for file in files:
+            key = file.id or file.url_private
+            if key in self.decisions or key in candidates:
+                continue
+            skip_reason = self.get_rule_skip_reason(file=file)
+            if skip_reason:
+                self.skip(key=key, file=file, reason=skip_reason)
+            else:
+                candidates[key] = file
+        remaining_bytes = self.get_remaining_bytes()
+        planned_bytes = sum(file.size for file in candidates.values())
+        if remaining_bytes is not None:
+            for key, file in sorted(candidates.items(), key=lambda candidate: candidate[1].size, reverse=True):
+                if planned_bytes <= remaining_bytes:
+                    break
+                self.skip(key=key, file=file, reason="over byte budget")
+                planned_bytes -= file.size
+        for key, file in candidates.items():
+            if key not in self.decisions:
+                self.allow(key=key, file=file)
+
+    def check(self, file: SlackFile):
+        # returns why the file is not downloaded, or None, files missing from the planned inventory are decided
+        # one at a time against what is left of the budget
+        key = file.id or file.url_private
+        if key not in self.decisions:
+            skip_reason = self.get_rule_skip_reason(file=file)
+            remaining_bytes = self.get_remaining_bytes()
+            if not skip_reason and remaining_bytes is not None and file.size > remaining_bytes:
+                skip_reason = "over byte budget"
+            if skip_reason:
+                self.skip(key=key, file=file, reason=skip_reason)
+            else:
+                self.allow(key=key, file=file)
+        return self.decisions[key]
+
+    def allow(self, key: str, file: SlackFile):
+        self.decisions[key] = None
+        self.chat_bytes += file.size
+        self.run_bytes += file.size
+
+    def skip(self, key: str, file: SlackFile, reason: str):
+        self.decisions[key] = reason
+        self.skipped_files += 1
+        self.skipped_bytes += file.size
+
+    def log_chat(self, chat_name: str):
+        if self.skipped_files:
+            logger.info(f"Media policy skipped {self.skipped_files} files ({self.skipped_bytes} bytes) in "
+                        f"{chat_name} chat.")
@@ -0,0 +1,132 @@
+import sys
+from typing import Optional
+
+
+class SlackFile:
+    __slots__ = ("id", "name", "filetype", "mimetype", "size", "url_private", "thumb_360", "thumb_720")
+
+    def __init__(self, name: Optional[str], filetype: str = "", url_private: Optional[str] = None,
+                 id: Optional[str] = None, thumb_360: Optional[str] = None, thumb_720: Optional[str] = None,
+                 mimetype: str = "", size: int = 0):
+        self.id = id
+        self.name = name
+        self.filetype = filetype
+        self.mimetype = mimetype
+        self.size = size
+        self.url_private = url_private
+        self.thumb_360 = thumb_360
+        self.thumb_720 = thumb_720
+
+    def __repr__(self):
+        return f"SlackFile(id={self.id!r}, name={self.name!r}, filetype={self.filetype!r})"
+
+    @classmethod
+    def from_dict(cls, file: dict):
+        return cls(
+            name=file.get("name"),
+            filetype=file.get("filetype") or "",
+            url_private=file.get("url_private"),
+            id=file.get("id"),
+            thumb_360=file.get("thumb_360"),
+            thumb_720=file.get("thumb_720"),
+            mimetype=file.get("mimetype") or "",
+            size=file.get("size") or 0
+        )
+
+    def to_dict(self):
+        file = {"id": self.id, "name": self.name, "filetype": self.filetype, "url_private": self.url_private}
+        if self.mimetype:
+            file["mimetype"] = self.mimetype
+        if self.size:
+            file["size"] = self.size
+        if self.thumb_360:
+            file["thumb_360"] = self.thumb_360
+        if self.thumb_720:
+            file["thumb_720"] = self.thumb_720
+        return file
+
+
+class SlackAttachment:
+    __slots__ = ("pretext", "title", "text", "image_url")
+
+    def __init__(self, pretext: str = "", title: Optional[str] = None, text: Optional[str] = None,
+                 image_url: Optional[str] = None):
+        self.pretext = pretext
+        self.title = title
+        self.text = text
+        self.image_url = image_url
+
+    @classmethod
+    def from_dict(cls, attachment: dict):
+        return cls(
+            pretext=attachment.get("pretext", ""),
+            title=attachment.get("title"),
+            text=attachment.get("text"),
+            image_url=attachment.get("image_url")
+        )
+
+
+class SlackMessage:
+    # keeps only the fields the exporter renders instead of the full slack_sdk response dict
+    __slots__ = ("ts", "user", "text", "files", "reply_count", "latest_reply", "edited_ts", "_attachments")
+
+    def __init__(self, ts: str, user: Optional[str], text: str = "", files: tuple = (), reply_count: int = 0,
+                 attachments: Optional[list] = None, edited_ts: Optional[str] = None,
+                 latest_reply: Optional[str] = None):
+        self.ts = ts
+        self.user = sys.intern(user) if user else None
+        self.text = text
+        self.files = files
+        self.reply_count = reply_count
+        self.latest_reply = latest_reply
+        self.edited_ts = edited_ts
+        self._attachments = attachments
+
+    def __repr__(self):
+        return f"SlackMessage(ts={self.ts!r}, user={self.user!r})"
+
+    @property
+    def attachments(self):
+        # attachments stay as trimmed raw dicts until something renders them
+        if self._attachments and isinstance(self._attachments, list):
+            self._attachments = tuple(SlackAttachment.from_dict(attachment) for attachment in self._attachments)
+        return self._attachments or ()
+
+    @classmethod
+    def from_dict(cls, message: dict):
+        attachments = None
+        if message.get("attachments"):
+            attachments = [
+                {key: attachment[key] for key in ("pretext", "title", "text", "image_url") if key in attachment}
+                for attachment in message["attachments"]
+            ]
+        return cls(
+            ts=message["ts"],
+            user=message.get("user") or message.get("bot_id"),
+            text=message.get("text") or "",
+            files=tuple(SlackFile.from_dict(file) for file in message.get("files") or []),
+            reply_count=message.get("reply_count") or 0,
+            attachments=attachments,
+            edited_ts=(message.get("edited") or {}).get("ts"),
+            latest_reply=message.get("latest_reply")
+        )
+
+    def to_dict(self):
+        message = {"ts": self.ts, "user": self.user}
+        if self.text:
+            message["text"] = self.text
+        if self.files:
+            message["files"] = [file.to_dict() for file in self.files]
+        if self.reply_count:
+            message["reply_count"] = self.reply_count
+        if self.latest_reply:
+            message["latest_reply"] = self.latest_reply
+        if self.edited_ts:
+            message["edited"] = {"ts": self.edited_ts}
+        if self._attachments:
+            message["attachments"] = [
+                {key: getattr(attachment, key) for key in SlackAttachment.__slots__ if getattr(attachment, key)}
+                if isinstance(attachment, SlackAttachment) else attachment
+                for attachment in self._attachments
+            ]
+        return message
@@ -0,0 +1,205 @@
+import re
+from html import unescape
+from typing import Callable, Optional
+
+# slack sends literal <, > and & as entities, so a raw <...> is always a mention, channel, link or command.
+# only markup is a token, the plain text between two tokens is escaped in one call. every alternative starts with a
+# literal character, which lets the regex engine skip plain text by the set of those characters instead of trying
+# every alternative at every position. the group closing last names the token
+token_pattern = re.compile(r"""
+    ```(?P<pre>.*?)```
+    | `(?P<code>[^`\n]+)`
+    | <(?P<special>[^<>\n]+)>
+    | &gt;(?<![^\n]&gt;)\ ?(?P<quote>)
+    | \*(?<![\w*]\*)(?P<bold>\S(?:[^*\n]*?\S)?)\*(?![\w*])
+    | _(?<![\w_]_)(?P<italic>\S(?:[^_\n]*?\S)?)_(?![\w_])
+    | ~(?<![\w~]~)(?P<strike>\S(?:[^~\n]*?\S)?)~(?![\w~])
+    | \n(?P<newline>)
+""", re.DOTALL | re.VERBOSE)
+
+# the characters a token can start with, text without any of them renders as just its escaped self
+token_start_pattern = re.compile(r"[`<&*_~\n]")
+
+# the html element of each span token
+span_tags = {"bold": "strong", "italic": "em", "strike": "del"}
+
+# an & that does not start an entity
+bare_ampersand_pattern = re.compile(r"&(?!(?:amp|lt|gt|quot|#\d+|#x[0-9a-fA-F]+);)")
+
+# only these schemes become links, anything else like javascript: or data: is shown as escaped text
+url_scheme_pattern = re.compile(r"(?:https?|mailto|tel|ftp|sftp|slack):", re.IGNORECASE)
+
+markdown_escape_pattern = re.compile(r"[\\`*_\[\]<>~|]")
+
+markdown_escaped_characters = str.maketrans({character: f"\\{character}" for character in "\\`*_[]<>~|"})
+
+broadcast_names = {"here": "@here", "channel": "@channel", "everyone": "@everyone"}
+
+
+def escape_html(text: str):
+    # escapes markup but keeps the entities slack already encoded, a fixed replacement string and str.replace stay
+    # in c where a replacement function would be called back for every match
+    if "&" in text:
+        text = bare_ampersand_pattern.sub("&amp;", text)
+    return text.replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+
+
+class MrkdwnRenderer:
+    def __init__(self, resolve_user: Optional[Callable[[str], str]] = None):
+        self.resolve_user = resolve_user
+
+    def render(self, text: str):
+        # renders a whole message text into paragraphs and code blocks in a single scan
+        blocks = []
+        paragraph = self.render_inline(text, blocks=blocks)
+        if paragraph:
+            blocks.append(f"<p><bdi>{paragraph}</bdi></p>")
+        return "".join(blocks)
+
+    def render_inline(self, text: str, blocks: Optional[list] = None):
+        html = []
+        position = 0
+        in_quote = False
+        for match in token_pattern.finditer(text):
+            start = match.start()
+            if start != position:
+                html.append(escape_html(text[position:start]))
+            position = match.end()
+            # the most frequent tokens are checked first
+            token_type = match.lastgroup
+            if token_type == "special":
+                html.append(self.render_special(match.group("special")))
+            elif token_type == "newline":
+                if in_quote:
+                    html.append("</span>")
+                    in_quote = False
+                else:
+                    html.append("<br>")
+            elif token_type in span_tags:
+                span = match.group(token_type)
+                # a span without markup inside needs no scan of its own
+                span_html = self.render_inline(span) if token_start_pattern.search(span) else escape_html(span)
+                html.append(f"<{span_tags[token_type]}>{span_html}</{span_tags[token_type]}>")
+            elif token_type == "code":
+                html.append(f"<code>{escape_html(match.group('code'))}</code>")
+            elif token_type == "quote":
+                html.append('<span class="quote">')
+                in_quote = True
+            elif blocks is None:
+                html.append(f"<code>{escape_html(match.group('pre'))}</code>")
+            else:
+                if in_quote:
+                    html.append("</span>")
+                    in_quote = False
+                if paragraph := "".join(html):
+                    blocks.append(f"<p><bdi>{paragraph}</bdi></p>")
+                html = []
+                blocks.append(f'<div class="code-block"><pre>{escape_html(match.group("pre"))}</pre></div>')
+        html.append(escape_html(text[position:]))
+        if in_quote:
+            html.append("</span>")
+        return "".join(html)
+
+    def render_special(self, body: str):
+        target, _, label = body.partition("|")
+        if target.startswith("@"):
+            user_name = label
+            if self.resolve_user:
+                user_name = self.resolve_user(target[1:]) or label
+            return f'<span class="mention">@{escape_html(user_name or target[1:])}</span>'
+        if target.startswith("#"):
+            return f'<span class="mention">#{escape_html(label or target[1:])}</span>'
+        if target.startswith("!"):
+            command = target[1:]
+            if command in broadcast_names:
+                return f'<span class="mention">{broadcast_names[command]}</span>'
+            # subteam mentions and dates carry their own fallback text
+            return f'<span class="mention">{escape_html(label or command)}</span>'
+        if url_scheme_pattern.match(target):
+            return f'<a href="{escape_html(target)}" target="_blank">{escape_html(label or target)}</a>'
+        return escape_html(f"<{body}>")
+
+
+class MrkdwnTextRenderer:
+    # plain text for archiving, formatting marks are dropped while mentions, links and entities are resolved
+    bold = ("", "")
+    italic = ("", "")
+    strike = ("", "")
+    code = ("", "")
+    code_block = ("\n", "\n")
+    line_break = "\n"
+    quote_end = "\n"
+
+    def __init__(self, resolve_user: Optional[Callable[[str], str]] = None):
+        self.resolve_user = resolve_user
+
+    def escape(self, text: str):
+        return text
+
+    def render_link(self, url: str, label: str):
+        return url if not label or label == url else f"{label} ({url})"
+
+    def render(self, text: str):
+        parts = []
+        position = 0
+        in_quote = False
+        for match in token_pattern.finditer(text):
+            parts.append(self.escape(unescape(text[position:match.start()])))
+            position = match.end()
+            token_type = match.lastgroup
+            if token_type == "pre":
+                parts.append(f"{self.code_block[0]}{unescape(match.group('pre'))}{self.code_block[1]}")
+            elif token_type == "code":
+                parts.append(f"{self.code[0]}{unescape(match.group('code'))}{self.code[1]}")
+            elif token_type == "special":
+                parts.append(self.render_special(match.group("special")))
+            elif token_type == "quote":
+                parts.append("> ")
+                in_quote = True
+            elif token_type in ("bold", "italic", "strike"):
+                marks = getattr(self, token_type)
+                parts.append(f"{marks[0]}{self.render(match.group(token_type))}{marks[1]}")
+            elif token_type == "newline":
+                parts.append(self.quote_end if in_quote else self.line_break)
+                in_quote = False
+        parts.append(self.escape(unescape(text[position:])))
+        return "".join(parts)
+
+    def render_special(self, body: str):
+        target, _, label = body.partition("|")
+        if target.startswith("@"):
+            user_name = label
+            if self.resolve_user:
+                user_name = self.resolve_user(target[1:]) or label
+            return self.escape(f"@{user_name or target[1:]}")
+        if target.startswith("#"):
+            return self.escape(f"#{label or target[1:]}")
+        if target.startswith("!"):
+            command = target[1:]
+            return self.escape(broadcast_names.get(command) or label or command)
+        if url_scheme_pattern.match(target):
+            # slack sends the & < > of links entity encoded, plain text shows them as they are
+            return self.render_link(url=unescape(target), label=unescape(label))
+        return self.escape(f"<{body}>")
+
+
+class MrkdwnMarkdownRenderer(MrkdwnTextRenderer):
+    bold = ("**", "**")
+    italic = ("_", "_")
+    strike = ("~~", "~~")
+    code = ("`", "`")
+    code_block = ("\n```\n", "\n```\n")
+    line_break = "  \n"
+    # a blank line ends the blockquote, otherwise the next line would continue it
+    quote_end = "\n\n"
+
+    def escape(self, text: str):
+        # most segments are plain words, the search is cheaper than translating them
+        if not markdown_escape_pattern.search(text):
+            return text
+        return text.translate(markdown_escaped_characters)
+
+    def render_link(self, url: str, label: str):
+        # a < or > would end the <...> destination early
+        destination = url.replace("<", "%3C").replace(">", "%3E")
+        return f"[{self.escape(label or url)}](<{destination}>)"
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from libraries.models import SlackMessage
+from libraries.stats import ChatStats
+
+logger = logging.getLogger(__name__)
+
+
+class DayPageStore:
+    # one script fragment per local calendar day, a fragment is only rewritten when its content hash changes
+    def __init__(self, folder_path: str, renderer_version: str = ""):
+        self.folder_path = folder_path
+        self.renderer_version = renderer_version
+        self.manifest_path = f"{folder_path}/manifest.json"
+        self.days = {}
+        self.written_days = 0
+        self.unchanged_days = 0
+        self.removed_days = 0
+        self.skipped_days = 0
+        if not os.path.exists(folder_path):
+            os.makedirs(folder_path)
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, "r") as f:
+                    self.days = json.load(f)["days"]
+            except (ValueError, KeyError) as e:
+                logger.error({
+                    "class": self.__class__.__name__,
+                    "method": "__init__",
+                    "error_message": "Error reading day pages manifest, all days will be written again.",
+                    "manifest_path": self.manifest_path,
+                    "error": str(e)
+                })
+                self.days = {}
+
+    @staticmethod
+    def get_day_start(timestamp: float):
+        return datetime.fromtimestamp(timestamp).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def get_date_start(date: str):
+        return datetime.strptime(date, "%Y-%m-%d").timestamp()
+
+    def get_sync_window(self, oldest: Optional[str] = None, latest: Optional[str] = None, full_sync: bool = False,
+                        reconcile_days: int = 7):
+        # widens the fetch window to whole days so every day it touches is rendered complete, without an oldest
+        # bound a chat that was exported before is synced from its newest stored day, going back reconcile_days
+        # more so edits, deletions and new thread replies in recent days are picked up too
+        if oldest:
+            oldest = f"{self.get_day_start(float(oldest)).timestamp():.6f}"
+        elif self.days and not full_sync:
+            newest_day = datetime.strptime(max(self.days), "%Y-%m-%d")
+            oldest = f"{(newest_day - timedelta(days=reconcile_days)).timestamp():.6f}"
+        if latest:
+            day_start = self.get_day_start(float(latest))
+            if day_start.timestamp() != float(latest):
+                latest = f"{(day_start + timedelta(days=1)).timestamp():.6f}"
+        return oldest, latest
+
+    def get_fingerprints(self, messages: Iterable[SlackMessage]):
+        # hashes what a cheap history scan can tell about each day, so a day is only rendered again when a message
+        # was added, edited or deleted, one of its threads got a new reply or the renderer changed
+        day_hashes = {}
+        for message in messages:
+            date = datetime.fromtimestamp(float(message.ts)).strftime("%Y-%m-%d")
+            if date not in day_hashes:
+                day_hashes[date] = hashlib.sha256(f"{self.renderer_version}\n".encode())
+            day_hashes[date].update(
+                f"{message.ts}|{message.edited_ts or ''}|{message.reply_count}|{message.latest_reply or ''}\n".encode()
+            )
+        return {date: day_hash.hexdigest() for date, day_hash in day_hashes.items()}
+
+    def get_changed_dates(self, fingerprints: dict):
+        return {
+            date for date, fingerprint in fingerprints.items()
+            if self.days.get(date, {}).get("fingerprint") != fingerprint or not os.path.exists(self.get_day_path(date))
+        }
+
+    def get_dates(self):
+        return sorted(self.days)
+
+    def get_dates_between(self, oldest: Optional[str] = None, latest: Optional[str] = None):
+        return [
+            date for date in self.get_dates()
+            if (not oldest or self.get_date_start(date) >= float(oldest))
+            and (not latest or self.get_date_start(date) < float(latest))
+        ]
+
+    def get_day_path(self, date: str):
+        return f"{self.folder_path}/{date}.js"
+
+    def get_day_hash(self, date: str):
+        return self.days[date]["hash"]
+
+    def write_day(self, date: str, content: str, message_count: int, fingerprint: Optional[str] = None,
+                  stats: Optional[dict] = None):
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        day_path = self.get_day_path(date)
+        if self.days.get(date, {}).get("hash") == content_hash and os.path.exists(day_path):
+            self.days[date]["fingerprint"] = fingerprint
+            self.days[date]["stats"] = stats
+            self.unchanged_days += 1
+            return False
+        with open(day_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        self.days[date] = {"hash": content_hash, "messages": message_count, "fingerprint": fingerprint,
+                           "stats": stats}
+        self.written_days += 1
+        return True
+
+    def get_stats(self):
+        # the chat's stats are the sum of the stats stored for every day, including days skipped in this sync
+        stats = ChatStats()
+        for date in self.get_dates():
+            stats.merge(ChatStats.from_dict(self.days[date].get("stats")))
+        return stats
+
+    def remove_days(self, dates: list):
+        for date in dates:
+            if os.path.exists(self.get_day_path(date)):
+                os.remove(self.get_day_path(date))
+            self.days.pop(date, None)
+            self.removed_days += 1
+
+    def save_manifest(self):
+        with open(self.manifest_path, "w") as f:
+            json.dump({"days": self.days}, f, indent=1, sort_keys=True)
+        logger.info(f"Day pages: {self.written_days} written, {self.unchanged_days} unchanged, "
+                    f"{self.skipped_days} skipped, {self.removed_days} removed.")
@@ -0,0 +1,133 @@
+import cProfile
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class ExportProfiler:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stages = {}
+        self.active_stages = []
+        # stages run on worker threads, their profiles are merged into one pstats.Stats per stage
+        self.worker_stages = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        stage_data = self.stages.setdefault(name, {
+            "profile": cProfile.Profile(),
+            "calls": 0,
+            "wall_seconds": 0.0,
+            "peak_memory": 0,
+        })
+        if stage_data in self.active_stages:
+            # the stage is already being measured further up the stack
+            yield
+            return
+        # only one profiler can be enabled at a time, so pause the outer stage while this one runs
+        outer_stage = self.active_stages[-1] if self.active_stages else None
+        if outer_stage:
+            outer_stage["profile"].disable()
+            outer_stage["peak_memory"] = max(outer_stage["peak_memory"], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self.active_stages.append(stage_data)
+        start_time = time.perf_counter()
+        stage_data["profile"].enable()
+        try:
+            yield
+        finally:
+            stage_data["profile"].disable()
+            stage_data["wall_seconds"] += time.perf_counter() - start_time
+            stage_data["calls"] += 1
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            stage_data["peak_memory"] = max(stage_data["peak_memory"], peak_memory)
+            self.active_stages.pop()
+            if outer_stage:
+                outer_stage["peak_memory"] = max(outer_stage["peak_memory"], peak_memory)
+                outer_stage["profile"].enable()
+
+    @contextmanager
+    def worker_stage(self, name: str):
+        # cProfile only follows the thread that enabled it, so every run on a worker thread gets its own profiler,
+        # the stage that waits for the workers on the calling thread mostly measures that wait
+        if not self.enabled:
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # python 3.12 and later allow one active profiler per process, the run is only timed then
+            profile = None
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            wall_seconds = time.perf_counter() - start_time
+            with self.lock:
+                stage_data = self.worker_stages.setdefault(name, {"stats": None, "calls": 0, "wall_seconds": 0.0})
+                stage_data["calls"] += 1
+                stage_data["wall_seconds"] += wall_seconds
+                if profile and stage_data["stats"]:
+                    stage_data["stats"].add(profile)
+                elif profile:
+                    stage_data["stats"] = pstats.Stats(profile)
+
+    def dump(self, folder_path: str):
+        if not self.enabled or not (self.stages or self.worker_stages):
+            return
+        profile_folder_path = os.path.join(folder_path, "profile")
+        try:
+            if not os.path.exists(profile_folder_path):
+                os.makedirs(profile_folder_path)
+            summary = {}
+            for name, stage_data in self.stages.items():
+                stage_data["profile"].dump_stats(os.path.join(profile_folder_path, f"{name}.prof"))
+                summary[name] = {
+                    "calls": stage_data["calls"],
+                    "wall_seconds": round(stage_data["wall_seconds"], 3),
+                    "peak_memory": stage_data["peak_memory"],
+                    "threads": "calling",
+                }
+                logger.info(f"Profiled {name}: {summary[name]['calls']} calls, "
+                            f"{summary[name]['wall_seconds']}s, peak memory {stage_data['peak_memory']} bytes.")
+            with self.lock:
+                for name, stage_data in self.worker_stages.items():
+                    if stage_data["stats"]:
+                        stage_data["stats"].dump_stats(os.path.join(profile_folder_path, f"{name}.prof"))
+                    # wall seconds add up over threads running at the same time, memory is not split by thread
+                    summary[name] = {
+                        "calls": stage_data["calls"],
+                        "wall_seconds": round(stage_data["wall_seconds"], 3),
+                        "threads": "workers",
+                    }
+                    logger.info(f"Profiled {name} on worker threads: {summary[name]['calls']} calls, "
+                                f"{summary[name]['wall_seconds']}s.")
+            with open(os.path.join(profile_folder_path, "memory.json"), "w") as f:
+                json.dump(summary, f, indent=4)
+        except Exception as e:
+            logger.exception(e)
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "dump",
+                "error_message": "Error saving profile data.",
+                "folder_path": folder_path,
+                "error": str(e)
+            })
+        self.stages = {}
+        self.worker_stages = {}
@@ -0,0 +1,66 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+class TransferScheduler:
+    # shared by the slack client and the media downloads, media chunks wait while any api call is running and
+    # are paced by a token bucket so bulk transfers cannot saturate the uplink or starve history paging
+    def __init__(self, media_bytes_per_second: Optional[int] = None, api_priority: bool = True):
+        self.media_bytes_per_second = media_bytes_per_second
+        self.api_priority = api_priority
+        self.active_api_calls = 0
+        self.condition = threading.Condition()
+        self.tokens = float(media_bytes_per_second or 0)
+        self.last_refill = time.monotonic()
+        self.bucket_lock = threading.Lock()
+
+    @contextmanager
+    def api_call(self):
+        with self.condition:
+            self.active_api_calls += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active_api_calls -= 1
+                if not self.active_api_calls:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def api_pause(self):
+        # an api call sleeping out a rate limit does not hold media back
+        with self.condition:
+            self.active_api_calls -= 1
+            if not self.active_api_calls:
+                self.condition.notify_all()
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active_api_calls += 1
+
+    def wait_for_api_calls(self):
+        if not self.api_priority:
+            return
+        with self.condition:
+            self.condition.wait_for(lambda: not self.active_api_calls)
+
+    def throttle_media(self, byte_count: int):
+        # called before each downloaded chunk
+        self.wait_for_api_calls()
+        if not self.media_bytes_per_second:
+            return
+        with self.bucket_lock:
+            now = time.monotonic()
+            self.tokens = min(
+                float(self.media_bytes_per_second),
+                self.tokens + (now - self.last_refill) * self.media_bytes_per_second
+            )
+            self.last_refill = now
+            # the bucket may go into debt, the caller then sleeps until it is paid back
+            self.tokens -= byte_count
+            wait_seconds = -self.tokens / self.media_bytes_per_second if self.tokens < 0 else 0
+        if wait_seconds:
+            time.sleep(wait_seconds)
@@ -0,0 +1,48 @@
+import json
+import re
+from typing import Optional
+
+from libraries.models import SlackMessage
+
+token_pattern = re.compile(r"\w+")
+
+snippet_length = 100
+
+
+class SearchIndex:
+    # inverted index from lowercase word tokens to the messages and thread replies that contain them, the exported
+    # page loads it as a script and searches it without rendering anything
+    def __init__(self):
+        self.documents = []
+        self.postings = {}
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add_message(self, message: SlackMessage, user_name: str, thread_ts: Optional[str] = None):
+        texts = [message.text or ""]
+        for attachment in message.attachments:
+            texts.extend([attachment.pretext or "", attachment.title or "", attachment.text or ""])
+        texts.extend(file.name or "" for file in message.files)
+        self.add(ts=message.ts, user_name=user_name, text="\n".join(text for text in texts if text),
+                 thread_ts=thread_ts)
+
+    def add(self, ts: str, user_name: str, text: str, thread_ts: Optional[str] = None):
+        document_id = len(self.documents)
+        self.documents.append([ts, thread_ts or "", user_name, " ".join(text.split())[:snippet_length]])
+        for token in set(token_pattern.findall(text.lower())):
+            # single characters match almost everything and are left out to keep the index small
+            if len(token) > 1:
+                self.postings.setdefault(token, []).append(document_id)
+
+    def to_dict(self):
+        # document ids are added in order, so each posting list is sorted and stored as gaps between ids
+        tokens = {}
+        for token, document_ids in sorted(self.postings.items()):
+            tokens[token] = [document_ids[0]] + [
+                document_id - previous_id for previous_id, document_id in zip(document_ids, document_ids[1:])
+            ]
+        return {"docs": self.documents, "tokens": tokens}
+
+    def to_script(self):
+        return f"addSearchIndex({json.dumps(self.to_dict(), ensure_ascii=True, separators=(',', ':'))});\n"
@@ -1,16 +1,54 @@
 import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
+from libraries.models import SlackFile, SlackMessage
+from libraries.profiling import ExportProfiler
+from libraries.scheduler import TransferScheduler
+from libraries.tracing import TraceRecorder
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
+
+
+class TracedRetryHandler:
+    # wraps a slack_sdk retry handler so the time spent waiting before a retry shows up in the trace and does not
+    # hold back media downloads
+    def __init__(self, retry_handler, tracer: TraceRecorder, scheduler: TransferScheduler):
+        self.retry_handler = retry_handler
+        self.tracer = tracer
+        self.scheduler = scheduler
+
+    def can_retry(self, *, state, request, response=None, error=None):
+        return self.retry_handler.can_retry(state=state, request=request, response=response, error=error)
+
+    def prepare_for_next_attempt(self, *, state, request, response=None, error=None):
+        retry_after = None
+        if response is not None:
+            retry_after = {k.lower(): v for k, v in response.headers.items()}.get("retry-after")
+        with self.tracer.span("rate limit pause", "slack", url=request.url, retry_after=retry_after), \
+                self.scheduler.api_pause():
+            self.retry_handler.prepare_for_next_attempt(state=state, request=request, response=response, error=error)
 
 
 class SlackClient:
-    def __init__(self, token):
+    def __init__(self, token, tracer: Optional[TraceRecorder] = None, scheduler: Optional[TransferScheduler] = None,
+                 profiler: Optional[ExportProfiler] = None):
+        # slack_sdk takes longer to import than the rest of the exporter, so it is only loaded once a client is needed
+        from slack_sdk import WebClient
+        from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
+
+        self.tracer = tracer or TraceRecorder()
+        self.scheduler = scheduler or TransferScheduler()
+        self.profiler = profiler or ExportProfiler()
         self.client = WebClient(token=token)
+        self.client.retry_handlers.append(TracedRetryHandler(
+            retry_handler=RateLimitErrorRetryHandler(max_retry_count=3),
+            tracer=self.tracer,
+            scheduler=self.scheduler
+        ))
 
     def get_chats_list(self, chat_type: str, limit: Optional[int] = 9999,
                        exclude_archived: Optional[bool] = True):
@@ -62,14 +100,17 @@ class SlackClient:
         return channels
 
     def fetch_chats_list(self, chat_type: str, limit: Optional[int] = 9999, exclude_archived: Optional[bool] = True):
+        from slack_sdk.errors import SlackApiError
+
         conversations = []
         try:
             logger.info(f"Fetching {chat_type} messages...")
-            conversations = self.client.conversations_list(
-                types=chat_type,
-                limit=limit,
-                exclude_archived=exclude_archived
-            )
+            with self.scheduler.api_call():
+                conversations = self.client.conversations_list(
+                    types=chat_type,
+                    limit=limit,
+                    exclude_archived=exclude_archived
+                )
         except SlackApiError as e:
             logger.error({
                 "class": "SlackClient",
@@ -87,8 +128,11 @@ class SlackClient:
         return conversations
 
     def get_user_name(self, user_id: str):
+        from slack_sdk.errors import SlackApiError
+
         try:
-            user_info = self.client.users_info(user=user_id)["user"]
+            with self.scheduler.api_call():
+                user_info = self.client.users_info(user=user_id)["user"]
             try:
                 user_data = {"name": user_info["name"], "real_name": user_info["real_name"]}
             except KeyError:
@@ -104,39 +148,196 @@ class SlackClient:
             user_data = {"name": user_id, "real_name": user_id}
         return user_data
 
-    def get_chat_messages(self, chat_id: str, chat_name: str):
+    def get_chat_messages(self, chat_id: str, chat_name: str, oldest: Optional[str] = None,
+                          latest: Optional[str] = None):
         messages = []
+        for page in self.iter_chat_history_pages(chat_id=chat_id, chat_name=chat_name, oldest=oldest, latest=latest):
+            messages += page
+        return messages
+
+    def iter_chat_history_pages(self, chat_id: str, chat_name: str, oldest: Optional[str] = None,
+                                latest: Optional[str] = None, inclusive: bool = False, raise_errors: bool = False):
+        # with raise_errors a failed page is raised after it is logged, so callers can tell a partial history from
+        # a complete one
+        from slack_sdk.errors import SlackApiError
+
+        history_filters = {}
+        if oldest:
+            history_filters["oldest"] = oldest
+        if latest:
+            history_filters["latest"] = latest
+        if inclusive:
+            history_filters["inclusive"] = True
+        message_count = 0
         try:
             logger.info(f"Fetching messages from {chat_id}...")
-            response = self.client.conversations_history(channel=chat_id)
-            messages += response["messages"]
+            with self.tracer.span("history page", "slack", chat_id=chat_id, page=1, **history_filters), \
+                    self.scheduler.api_call():
+                response = self.client.conversations_history(channel=chat_id, **history_filters)
+            message_count += len(response["messages"])
+            yield [SlackMessage.from_dict(message) for message in response["messages"]]
+            page = 1
             while response["has_more"]:
-                response = self.client.conversations_history(
-                    channel=chat_id,
-                    cursor=response["response_metadata"]["next_cursor"]
-                )
-                messages += response["messages"]
+                page += 1
+                with self.tracer.span("history page", "slack", chat_id=chat_id, page=page, **history_filters), \
+                        self.scheduler.api_call():
+                    response = self.client.conversations_history(
+                        channel=chat_id,
+                        cursor=response["response_metadata"]["next_cursor"],
+                        **history_filters
+                    )
+                message_count += len(response["messages"])
+                yield [SlackMessage.from_dict(message) for message in response["messages"]]
         except SlackApiError as e:
             logger.error({
                 "class": "SlackClient",
-                "method": "get_chat_history",
+                "method": "iter_chat_history_pages",
                 "error_message": "Error fetching messages.",
                 "chat_id": chat_id,
                 "error": str(e)
             })
-        if messages:
-            logger.info(f"Found {len(messages)} messages in {chat_name} chat.")
+            if raise_errors:
+                raise
+        if message_count:
+            logger.info(f"Found {message_count} messages in {chat_name} chat.")
         else:
             logger.info(f"No messages found in {chat_name} chat.")
-        return messages
+
+    def iter_sharded_chat_history_pages(self, chat_id: str, chat_name: str, oldest: Optional[str] = None,
+                                        latest: Optional[str] = None, shard_count: int = 8, max_workers: int = 4):
+        # splits the time range into windows that are paginated in parallel, yields (shard_index, page) where
+        # shard 0 is the newest window, pages of one shard arrive in order but shards interleave, the error of a
+        # failed window is raised here
+        oldest_time = float(oldest) if oldest else float(self.get_chat_created(chat_id=chat_id))
+        latest_time = float(latest) if latest else time.time()
+        window_size = (latest_time - oldest_time) / shard_count
+        bounds = [f"{latest_time - window_size * i:.6f}" for i in range(shard_count)] + [f"{oldest_time:.6f}"]
+        pages = queue.Queue(maxsize=max_workers * 2)
+        stop_event = threading.Event()
+
+        def put_page(item):
+            while not stop_event.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def fetch_shard(shard_index: int):
+            shard_latest, shard_oldest = bounds[shard_index], bounds[shard_index + 1]
+            is_oldest_shard = shard_index == shard_count - 1
+            # profiled on the shard thread, the history stage of the exporter only sees the wait for its pages
+            with self.profiler.worker_stage("history shards"):
+                try:
+                    # fetched inclusive so a message sitting exactly on a boundary is kept by the newer window only
+                    for page in self.iter_chat_history_pages(
+                        chat_id=chat_id,
+                        chat_name=f"{chat_name} ({shard_index + 1}/{shard_count})",
+                        oldest=shard_oldest,
+                        latest=shard_latest,
+                        inclusive=True,
+                        raise_errors=True
+                    ):
+                        if stop_event.is_set():
+                            return
+                        put_page((shard_index, [
+                            message for message in page
+                            if float(message.ts) < float(shard_latest) and (
+                                float(message.ts) > float(shard_oldest)
+                                or (float(message.ts) == float(shard_oldest) and not is_oldest_shard)
+                            )
+                        ]))
+                except Exception as e:
+                    logger.exception(e)
+                    logger.error({
+                        "class": self.__class__.__name__,
+                        "method": "iter_sharded_chat_history_pages",
+                        "error_message": "Error fetching messages.",
+                        "chat_id": chat_id,
+                        "oldest": shard_oldest,
+                        "latest": shard_latest,
+                        "error": str(e)
+                    })
+                    # handed to the consumer instead of the end marker, a missing window must not pass for an empty
+                    # one
+                    put_page((shard_index, e))
+                    return
+                put_page((shard_index, None))
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="history") as executor:
+            for shard_index in range(shard_count):
+                executor.submit(fetch_shard, shard_index)
+            finished_shards = 0
+            try:
+                while finished_shards < shard_count:
+                    shard_index, page = pages.get()
+                    if isinstance(page, Exception):
+                        raise page
+                    if page is None:
+                        finished_shards += 1
+                        continue
+                    yield shard_index, page
+            finally:
+                stop_event.set()
+
+    def iter_chat_files(self, chat_id: str, ts_from: Optional[str] = None, ts_to: Optional[str] = None,
+                        count: int = 200):
+        from slack_sdk.errors import SlackApiError
+
+        file_filters = {}
+        if ts_from:
+            file_filters["ts_from"] = ts_from
+        if ts_to:
+            file_filters["ts_to"] = ts_to
+        page = 1
+        pages = 1
+        try:
+            while page <= pages:
+                with self.tracer.span("files page", "slack", chat_id=chat_id, page=page, **file_filters), \
+                        self.scheduler.api_call():
+                    response = self.client.files_list(channel=chat_id, count=count, page=page, **file_filters)
+                for file in response.get("files") or []:
+                    yield SlackFile.from_dict(file)
+                pages = (response.get("paging") or {}).get("pages", 1)
+                page += 1
+        except (SlackApiError, OSError) as e:
+            # the inventory only lets downloads start early, on an api or network error (urllib and requests errors
+            # are OSErrors) the files not listed yet are downloaded once rendering finds them
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "iter_chat_files",
+                "error_message": "Error fetching files, the rest are downloaded as rendering finds them.",
+                "chat_id": chat_id,
+                "error": str(e)
+            })
+
+    def get_chat_created(self, chat_id: str):
+        from slack_sdk.errors import SlackApiError
+
+        try:
+            with self.scheduler.api_call():
+                return self.client.conversations_info(channel=chat_id)["channel"].get("created", 0)
+        except SlackApiError as e:
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "get_chat_created",
+                "error_message": "Error fetching chat info.",
+                "chat_id": chat_id,
+                "error": str(e)
+            })
+            return 0
 
     def get_message_replies(self, chat_id: str, message_ts: str):
+        from slack_sdk.errors import SlackApiError
+
         try:
-            response = self.client.conversations_replies(
-                channel=chat_id,
-                ts=message_ts
-            )
-            replies = [reply for reply in response.get("messages") if reply.get("ts") != message_ts]
+            with self.tracer.span("thread fetch", "slack", chat_id=chat_id, thread_ts=message_ts), \
+                    self.scheduler.api_call():
+                response = self.client.conversations_replies(
+                    channel=chat_id,
+                    ts=message_ts
+                )
+            replies = [SlackMessage.from_dict(reply) for reply in response.get("messages") if reply.get("ts") != message_ts]
         except SlackApiError as e:
             logger.error({
                 "class": self.__class__.__name__,
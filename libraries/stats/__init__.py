@@ -0,0 +1,75 @@
+from datetime import datetime
+from typing import Optional
+
+from libraries.models import SlackMessage
+
+
+class ChatStats:
+    # counted while messages are rendered, so the workspace index never has to read an export again
+    def __init__(self):
+        self.messages = 0
+        self.replies = 0
+        self.media_bytes = 0
+        self.last_ts = None
+        self.months = {}
+        self.posters = {}
+
+    def add_message(self, message: SlackMessage, user_name: str, is_reply: bool = False):
+        if is_reply:
+            self.replies += 1
+        else:
+            self.messages += 1
+        month = datetime.fromtimestamp(float(message.ts)).strftime("%Y-%m")
+        self.months[month] = self.months.get(month, 0) + 1
+        self.posters[user_name] = self.posters.get(user_name, 0) + 1
+        self.media_bytes += sum(file.size for file in message.files)
+        if self.last_ts is None or float(message.ts) > float(self.last_ts):
+            self.last_ts = message.ts
+
+    def merge(self, other: "ChatStats"):
+        self.messages += other.messages
+        self.replies += other.replies
+        self.media_bytes += other.media_bytes
+        if other.last_ts is not None and (self.last_ts is None or float(other.last_ts) > float(self.last_ts)):
+            self.last_ts = other.last_ts
+        for month, count in other.months.items():
+            self.months[month] = self.months.get(month, 0) + count
+        for user_name, count in other.posters.items():
+            self.posters[user_name] = self.posters.get(user_name, 0) + count
+
+    def get_top_posters(self, count: int = 5):
+        return sorted(self.posters.items(), key=lambda poster: (-poster[1], poster[0]))[:count]
+
+    def get_month_counts(self):
+        # every month between the first and the last one, months without messages count 0
+        if not self.months:
+            return []
+        first_month, last_month = min(self.months), max(self.months)
+        year, month = int(first_month[:4]), int(first_month[5:])
+        month_counts = []
+        while f"{year:04d}-{month:02d}" <= last_month:
+            month_counts.append((f"{year:04d}-{month:02d}", self.months.get(f"{year:04d}-{month:02d}", 0)))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return month_counts
+
+    def to_dict(self):
+        return {
+            "messages": self.messages,
+            "replies": self.replies,
+            "media_bytes": self.media_bytes,
+            "last_ts": self.last_ts,
+            "months": self.months,
+            "posters": self.posters
+        }
+
+    @classmethod
+    def from_dict(cls, stats: Optional[dict]):
+        chat_stats = cls()
+        stats = stats or {}
+        chat_stats.messages = stats.get("messages", 0)
+        chat_stats.replies = stats.get("replies", 0)
+        chat_stats.media_bytes = stats.get("media_bytes", 0)
+        chat_stats.last_ts = stats.get("last_ts")
+        chat_stats.months = dict(stats.get("months", {}))
+        chat_stats.posters = dict(stats.get("posters", {}))
+        return chat_stats
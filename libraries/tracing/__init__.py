@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TraceRecorder:
+    def __init__(self, trace_path: Optional[str] = None):
+        self.trace_path = trace_path
+        self.enabled = bool(trace_path)
+        self.events = []
+        self.named_threads = set()
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.start_time = time.perf_counter()
+
+    def now(self):
+        # chrome trace timestamps are in microseconds
+        return (time.perf_counter() - self.start_time) * 1_000_000
+
+    @contextmanager
+    def span(self, name: str, category: str, **args):
+        if not self.enabled:
+            yield
+            return
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.record(name=name, category=category, start=start, **args)
+
+    def record(self, name: str, category: str, start: float, **args):
+        if not self.enabled:
+            return
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start,
+            "dur": self.now() - start,
+            "pid": self.pid,
+            "tid": self.get_thread_id(),
+            "args": args,
+        }
+        with self.lock:
+            self.events.append(event)
+
+    def instant(self, name: str, category: str, **args):
+        if not self.enabled:
+            return
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "i",
+            "s": "t",
+            "ts": self.now(),
+            "pid": self.pid,
+            "tid": self.get_thread_id(),
+            "args": args,
+        }
+        with self.lock:
+            self.events.append(event)
+
+    def get_thread_id(self):
+        thread = threading.current_thread()
+        thread_id = threading.get_ident()
+        if thread_id not in self.named_threads:
+            with self.lock:
+                self.named_threads.add(thread_id)
+                self.events.append({
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self.pid,
+                    "tid": thread_id,
+                    "args": {"name": thread.name},
+                })
+        return thread_id
+
+    def save(self):
+        if not self.enabled:
+            return
+        try:
+            with self.lock:
+                events = list(self.events)
+            with open(self.trace_path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+            logger.info(f"Saved {len(events)} trace events to {self.trace_path}.")
+        except Exception as e:
+            logger.exception(e)
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "save",
+                "error_message": "Error saving trace file.",
+                "trace_path": self.trace_path,
+                "error": str(e)
+            })
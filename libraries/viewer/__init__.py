@@ -0,0 +1,346 @@
+import json
+import logging
+import mimetypes
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from libraries.archive import SqliteArchive
+from libraries.mrkdwn import MrkdwnRenderer
+
+logger = logging.getLogger(__name__)
+
+default_page_size = 100
+
+max_page_size = 500
+
+file_chunk_size = 256 * 1024
+
+range_pattern = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class ArchiveViewer:
+    # serves an export folder with range requests for media, and a json api with a small browsing page over the
+    # sqlite archive, pages of messages and threads are read from the database only when they are asked for
+    def __init__(self, root_path: str, archive: Optional[SqliteArchive] = None, host: str = "127.0.0.1",
+                 port: int = 8080):
+        self.root_path = os.path.realpath(root_path)
+        self.archive = archive or SqliteArchive()
+        self.host = host
+        self.port = port
+        # one sqlite connection is shared by the request threads
+        self.lock = threading.Lock()
+        self.users = self.archive.get_users()
+        self.mrkdwn_renderer = MrkdwnRenderer(resolve_user=self.get_user_name)
+
+    def get_user_name(self, user_id: Optional[str]):
+        if not user_id:
+            return "Unknown"
+        return self.users.get(user_id, {}).get("real_name") or user_id
+
+    def get_chats(self):
+        with self.lock:
+            return self.archive.get_conversations()
+
+    def get_messages(self, chat_id: str, before: Optional[str] = None, until: Optional[str] = None,
+                     limit: int = default_page_size):
+        with self.lock:
+            messages = self.archive.get_messages(chat_id=chat_id, before=before, until=until, limit=limit)
+        return {
+            "messages": [self.convert_message(message=message) for message in messages],
+            # the client asks for the next page with before set to this, None once the oldest message was sent
+            "next": messages[-1]["ts"] if len(messages) == limit else None
+        }
+
+    def get_replies(self, chat_id: str, thread_ts: str):
+        with self.lock:
+            replies = self.archive.get_replies(chat_id=chat_id, thread_ts=thread_ts)
+        return {"replies": [self.convert_message(message=reply) for reply in replies]}
+
+    def search(self, query: str, limit: int = default_page_size):
+        with self.lock:
+            return {"results": self.archive.search(query=query, limit=limit)}
+
+    def convert_message(self, message: dict):
+        return {
+            "ts": message["ts"],
+            "thread_ts": message["thread_ts"],
+            "user_name": self.get_user_name(message["user"]),
+            "time": datetime.fromtimestamp(float(message["ts"])).strftime("%Y-%m-%d %H:%M:%S"),
+            "html": self.mrkdwn_renderer.render(message["text"]),
+            "reply_count": message["reply_count"],
+            "edited": message["edited_ts"] is not None,
+            "files": message["files"]
+        }
+
+    def get_file_path(self, url_path: str):
+        # None for anything outside the served folder
+        file_path = os.path.realpath(os.path.join(self.root_path, unquote(url_path).lstrip("/")))
+        if file_path != self.root_path and not file_path.startswith(self.root_path + os.sep):
+            return None
+        if os.path.isdir(file_path):
+            file_path = os.path.join(file_path, "index.html")
+        return file_path if os.path.isfile(file_path) else None
+
+    def serve(self):
+        server = ThreadingHTTPServer((self.host, self.port), ViewerRequestHandler)
+        server.daemon_threads = True
+        server.viewer = self
+        logger.info(f"Serving {self.root_path} on http://{self.host}:{self.port}/"
+                    + (f", archive viewer on http://{self.host}:{self.port}/viewer" if self.archive.enabled else ""))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+class ViewerRequestHandler(BaseHTTPRequestHandler):
+    server_version = "NanaSlackViewer"
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def handle_request(self, send_body: bool):
+        viewer = self.server.viewer
+        url = urlsplit(self.path)
+        parameters = {key: values[0] for key, values in parse_qs(url.query).items()}
+        path_parts = [unquote(part) for part in url.path.strip("/").split("/")]
+        try:
+            if path_parts[0] == "api":
+                if not viewer.archive.enabled:
+                    self.send_json({"error": "no archive database is served"}, status=HTTPStatus.NOT_FOUND,
+                                   send_body=send_body)
+                    return
+                limit = min(max(int(parameters.get("limit", default_page_size)), 1), max_page_size)
+                if path_parts[1:] == ["chats"]:
+                    self.send_json(viewer.get_chats(), send_body=send_body)
+                elif len(path_parts) == 4 and path_parts[1] == "chats" and path_parts[3] == "messages":
+                    self.send_json(viewer.get_messages(
+                        chat_id=path_parts[2],
+                        before=parameters.get("before"),
+                        until=parameters.get("until"),
+                        limit=limit
+                    ), send_body=send_body)
+                elif len(path_parts) == 5 and path_parts[1] == "chats" and path_parts[3] == "threads":
+                    self.send_json(viewer.get_replies(chat_id=path_parts[2], thread_ts=path_parts[4]),
+                                   send_body=send_body)
+                elif path_parts[1:] == ["search"] and parameters.get("q"):
+                    self.send_json(viewer.search(query=parameters["q"], limit=limit), send_body=send_body)
+                else:
+                    self.send_json({"error": "unknown api path"}, status=HTTPStatus.NOT_FOUND, send_body=send_body)
+            elif url.path == "/viewer" and viewer.archive.enabled:
+                self.send_content(viewer_page.encode("utf-8"), "text/html; charset=utf-8", send_body=send_body)
+            else:
+                self.send_file(file_path=viewer.get_file_path(url.path), send_body=send_body)
+        except ConnectionError:
+            # the browser dropped the connection, e.g. a video seeking to another range
+            pass
+        except (ValueError, sqlite3.Error) as e:
+            # a bad limit or a malformed fts5 query
+            self.send_json({"error": str(e)}, status=HTTPStatus.BAD_REQUEST, send_body=send_body)
+        except Exception as e:
+            logger.error({
+                "class": self.__class__.__name__,
+                "method": "handle_request",
+                "error_message": "Error serving request",
+                "path": self.path,
+                "error": str(e)
+            })
+            self.send_json({"error": str(e)}, status=HTTPStatus.INTERNAL_SERVER_ERROR, send_body=send_body)
+
+    def send_json(self, data, status: HTTPStatus = HTTPStatus.OK, send_body: bool = True):
+        self.send_content(json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8",
+                          status=status, send_body=send_body)
+
+    def send_content(self, content: bytes, content_type: str, status: HTTPStatus = HTTPStatus.OK,
+                     send_body: bool = True):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(content)
+
+    def send_file(self, file_path: Optional[str], send_body: bool = True):
+        if not file_path:
+            self.send_json({"error": "not found"}, status=HTTPStatus.NOT_FOUND, send_body=send_body)
+            return
+        file_size = os.path.getsize(file_path)
+        start, end = 0, file_size - 1
+        status = HTTPStatus.OK
+        # a single byte range lets video and audio seek without downloading the file, other ranges get everything
+        match = range_pattern.match(self.headers.get("Range", "").strip())
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), file_size - 1) if match.group(2) else file_size - 1
+            else:
+                start = max(file_size - int(match.group(2)), 0)
+            if start > end or start >= file_size:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{file_size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = HTTPStatus.PARTIAL_CONTENT
+        self.send_response(status)
+        self.send_header("Content-Type", mimetypes.guess_type(file_path)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Last-Modified", self.date_time_string(int(os.path.getmtime(file_path))))
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{file_size}")
+        self.end_headers()
+        if not send_body:
+            return
+        with open(file_path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(file_chunk_size, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+viewer_page = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Nana Slack | Viewer</title>
+    <style>
+        body { margin: 0; font-family: sans-serif; display: flex; height: 100vh; }
+        #chats { width: 260px; overflow-y: auto; border-right: 1px solid #ddd; }
+        #chats a, #results a { display: block; padding: 6px 10px; color: #1264a3; text-decoration: none; cursor: pointer; }
+        #chats a.selected { background: #1264a3; color: #fff; }
+        #main { flex: 1; display: flex; flex-direction: column; }
+        #bar { padding: 8px; border-bottom: 1px solid #ddd; }
+        #bar input { width: 60%; padding: 4px; }
+        #messages { flex: 1; overflow-y: auto; padding: 0 16px; }
+        .message { padding: 6px 0; border-bottom: 1px solid #f2f2f2; }
+        .time { color: #888; font-size: 12px; margin-left: 6px; }
+        .files { color: #555; font-size: 13px; }
+        .replies { margin-left: 24px; border-left: 3px solid #ddd; padding-left: 10px; }
+        button { margin: 10px 0; }
+    </style>
+</head>
+<body>
+<div id="chats"></div>
+<div id="main">
+    <div id="bar"><input id="query" placeholder="Search the archive (sqlite fts5 syntax)"></div>
+    <div id="messages"></div>
+</div>
+<script>
+    var chatId = null;
+    var next = null;
+
+    function escapeText(text) {
+        var div = document.createElement("div");
+        div.textContent = text;
+        return div.innerHTML;
+    }
+
+    function getJson(url) {
+        return fetch(url).then(function (response) {
+            return response.json();
+        });
+    }
+
+    function renderMessage(message) {
+        var files = message.files.map(function (file) {
+            return escapeText((file.name || file.id) + " (" + (file.size || 0) + " bytes)");
+        }).join(", ");
+        var html = '<div class="message" data-ts="' + message.ts + '"><strong>' + escapeText(message.user_name) +
+            '</strong><span class="time">' + message.time + (message.edited ? " (edited)" : "") + "</span>" +
+            message.html + (files ? '<div class="files">' + files + "</div>" : "");
+        if (message.reply_count) {
+            html += '<a href="#" onclick="return loadReplies(this, \\'' + message.ts + '\\')">' +
+                message.reply_count + " replies</a>";
+        }
+        return html + "</div>";
+    }
+
+    function openChat(id, until) {
+        chatId = id;
+        next = null;
+        document.querySelectorAll("#chats a").forEach(function (link) {
+            link.classList.toggle("selected", link.dataset.id === id);
+        });
+        document.getElementById("messages").innerHTML = "";
+        loadMessages(until ? "&until=" + encodeURIComponent(until) : "");
+        return false;
+    }
+
+    function loadMessages(cursor) {
+        var container = document.getElementById("messages");
+        var more = document.getElementById("more");
+        if (more) {
+            more.remove();
+        }
+        getJson("./api/chats/" + encodeURIComponent(chatId) + "/messages?limit=100" + cursor).then(function (page) {
+            // newest first from the api, older pages are added below
+            container.insertAdjacentHTML("beforeend", page.messages.map(renderMessage).join(""));
+            next = page.next;
+            if (next) {
+                container.insertAdjacentHTML("beforeend",
+                    '<button id="more" onclick="loadMessages(\\'&before=\\' + encodeURIComponent(next))">' +
+                    "Older messages</button>");
+            }
+        });
+    }
+
+    function loadReplies(link, ts) {
+        getJson("./api/chats/" + encodeURIComponent(chatId) + "/threads/" + encodeURIComponent(ts)).then(
+            function (thread) {
+                link.outerHTML = '<div class="replies">' + thread.replies.map(renderMessage).join("") + "</div>";
+            });
+        return false;
+    }
+
+    function search(query) {
+        getJson("./api/search?limit=100&q=" + encodeURIComponent(query)).then(function (result) {
+            var container = document.getElementById("messages");
+            if (result.error) {
+                container.innerHTML = "<p>" + escapeText(result.error) + "</p>";
+                return;
+            }
+            container.innerHTML = '<div id="results">' + result.results.map(function (match) {
+                return '<a onclick="return openChat(\\'' + match.chat_id + "', '" + (match.thread_ts || match.ts) +
+                    '\\')">' + escapeText(match.chat_name + " | " + match.user + ": " + match.snippet) + "</a>";
+            }).join("") + "</div>";
+        });
+    }
+
+    document.getElementById("query").addEventListener("keydown", function (event) {
+        if (event.key === "Enter" && event.target.value.trim()) {
+            search(event.target.value.trim());
+        }
+    });
+
+    getJson("./api/chats").then(function (chats) {
+        document.getElementById("chats").innerHTML = chats.map(function (chat) {
+            return '<a data-id="' + escapeText(chat.id) + '" onclick="return openChat(\\'' + chat.id + '\\')">' +
+                escapeText(chat.name) + " (" + chat.messages + ")</a>";
+        }).join("");
+    });
+</script>
+</body>
+</html>
+"""
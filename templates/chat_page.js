@@ -0,0 +1,189 @@
+var searchIndexes = [];
+var replies = {};
+var chunks = [];
+var chunkViews = [];
+var chunkStates = [];
+var chunkCallbacks = [];
+function addSearchIndex(index) {
+    searchIndexes.push(index);
+}
+function addDay(date, html, dayReplies, daySearchIndex) {
+    document.currentScript.insertAdjacentHTML("beforebegin", html);
+    Object.assign(replies, dayReplies);
+    if (daySearchIndex) {
+        addSearchIndex(daySearchIndex);
+    }
+}
+function initChunks(chunkList) {
+    // [first_ts, message_count, src] per chunk, chunks are loaded when they come near the viewport and emptied
+    // again once they scroll far away, so the dom only ever holds a few of them
+    chunks = chunkList;
+    var chunkObserver = new IntersectionObserver(function (entries) {
+        for (const entry of entries) {
+            var index = Number(entry.target.dataset.chunk);
+            if (entry.isIntersecting) {
+                loadChunk(index);
+            } else {
+                unloadChunk(index);
+            }
+        }
+    }, {rootMargin: "1500px 0px"});
+    chunks.forEach(function (chunk, index) {
+        var view = document.createElement("div");
+        view.style.display = "flow-root";
+        view.style.height = (chunk[1] * 90) + "px";
+        view.dataset.chunk = index;
+        document.getElementById("chunks").appendChild(view);
+        chunkViews.push(view);
+        chunkStates.push("empty");
+        chunkCallbacks.push([]);
+        chunkObserver.observe(view);
+    });
+}
+function loadChunk(index, callback) {
+    if (callback) {
+        chunkCallbacks[index].push(callback);
+    }
+    if (chunkStates[index] === "shown") {
+        runChunkCallbacks(index);
+    } else if (chunkStates[index] === "empty") {
+        chunkStates[index] = "loading";
+        var script = document.createElement("script");
+        script.src = chunks[index][2];
+        document.head.appendChild(script);
+    }
+}
+function addChunk(index, messages, chunkReplies) {
+    document.currentScript.remove();
+    Object.assign(replies, chunkReplies);
+    if (chunkStates[index] !== "loading") {
+        return;
+    }
+    chunkViews[index].innerHTML = messages.join("");
+    chunkViews[index].style.height = "";
+    chunkStates[index] = "shown";
+    runChunkCallbacks(index);
+}
+function unloadChunk(index) {
+    if (chunkStates[index] === "shown") {
+        // keep the rendered height so the scroll position does not jump
+        chunkViews[index].style.height = chunkViews[index].offsetHeight + "px";
+        chunkViews[index].innerHTML = "";
+    }
+    chunkStates[index] = "empty";
+}
+function runChunkCallbacks(index) {
+    var callbacks = chunkCallbacks[index];
+    chunkCallbacks[index] = [];
+    for (const callback of callbacks) {
+        callback();
+    }
+}
+function loadMessage(ts, callback) {
+    // the chunk holding ts is the last one starting at or before it
+    if (!chunks.length) {
+        return;
+    }
+    var index = 0;
+    while (index + 1 < chunks.length && parseFloat(chunks[index + 1][0]) <= parseFloat(ts)) {
+        index++;
+    }
+    chunkViews[index].scrollIntoView();
+    loadChunk(index, callback);
+}
+function showReplies(timestamp) {
+    var repliesHtml = '';
+    for (const element of replies[timestamp]) {
+        repliesHtml += element.html;
+    }
+    var parentContainer = document.querySelector(`button[data-timestamp="${timestamp}"]`).parentNode;
+    var repliesContainer = document.createElement('div');
+    repliesContainer.classList.add('replies-container');
+    repliesContainer.innerHTML = repliesHtml;
+    repliesContainer.setAttribute('data-timestamp', timestamp);
+    parentContainer.parentNode.insertBefore(repliesContainer, parentContainer.nextSibling);
+    parentContainer.removeChild(parentContainer.querySelector(`button[data-timestamp="${timestamp}"]`));
+}
+var searchIndexRequested = false;
+function loadSearchIndex() {
+    // the single page index is a side file that is only loaded once search is used
+    if (searchIndexRequested || searchIndexes.length) {
+        return;
+    }
+    searchIndexRequested = true;
+    var script = document.createElement('script');
+    script.src = './search.js';
+    script.onload = function () {
+        search(document.getElementById('search-input').value);
+    };
+    script.onerror = function () {
+        document.getElementById('search-results').textContent = 'No search index was exported with this chat.';
+    };
+    document.head.appendChild(script);
+}
+function searchIndex(index, terms) {
+    // every term has to match the start of a token, posting lists are stored as gaps between ids
+    var matches = null;
+    for (const term of terms) {
+        var termMatches = new Set();
+        for (const token in index.tokens) {
+            if (token.startsWith(term)) {
+                var documentId = 0;
+                for (const gap of index.tokens[token]) {
+                    documentId += gap;
+                    termMatches.add(documentId);
+                }
+            }
+        }
+        matches = matches === null ? termMatches : new Set([...matches].filter(id => termMatches.has(id)));
+        if (!matches.size) {
+            break;
+        }
+    }
+    return [...(matches || [])].map(id => index.docs[id]);
+}
+function search(query) {
+    var resultsContainer = document.getElementById('search-results');
+    resultsContainer.innerHTML = '';
+    var terms = query.toLowerCase().match(/[\p{L}\p{N}_]+/gu) || [];
+    if (!terms.length) {
+        return;
+    }
+    var results = [];
+    for (const index of searchIndexes) {
+        results.push(...searchIndex(index, terms));
+    }
+    results.sort((a, b) => parseFloat(a[0]) - parseFloat(b[0]));
+    for (const [ts, threadTs, userName, snippet] of results.slice(0, 100)) {
+        var result = document.createElement('div');
+        result.classList.add('search-result');
+        result.textContent = `${new Date(parseFloat(ts) * 1000).toLocaleString()} ${userName}: ${snippet}`;
+        result.onclick = () => openSearchResult(ts, threadTs);
+        resultsContainer.appendChild(result);
+    }
+    if (results.length > 100) {
+        var more = document.createElement('div');
+        more.classList.add('search-result');
+        more.textContent = `${results.length - 100} more matches, refine the search to see them`;
+        resultsContainer.appendChild(more);
+    }
+}
+function openSearchResult(ts, threadTs) {
+    // the virtual layout first has to load the chunk holding the message or its thread
+    if (chunks.length) {
+        loadMessage(threadTs || ts, () => showSearchResult(ts, threadTs));
+    } else {
+        showSearchResult(ts, threadTs);
+    }
+}
+function showSearchResult(ts, threadTs) {
+    if (threadTs && document.querySelector(`button[data-timestamp="${threadTs}"]`)) {
+        showReplies(threadTs);
+    }
+    var message = document.querySelector(`.message[data-ts="${ts}"]`);
+    if (message) {
+        message.scrollIntoView({block: 'center'});
+        message.classList.add('search-hit');
+        setTimeout(() => message.classList.remove('search-hit'), 2000);
+    }
+}
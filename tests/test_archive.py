@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+
+from libraries.archive import SqliteArchive
+from libraries.models import SlackMessage
+
+
+class ArchiveFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.archive = SqliteArchive(archive_path=os.path.join(self.temporary_folder.name, "archive.sqlite3"))
+
+    def tearDown(self):
+        self.archive.close()
+        self.temporary_folder.cleanup()
+
+    def test_files_of_a_page_use_the_message_index(self):
+        plan = self.archive.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT ts, id, name, filetype, mimetype, size FROM files "
+            "WHERE channel = ? AND ts BETWEEN ? AND ? ORDER BY ts, rowid",
+            ("C1", "1", "2")
+        ).fetchall()
+        details = " ".join(row[-1] for row in plan)
+        self.assertIn("USING INDEX files_message", details)
+        self.assertNotIn("TEMP B-TREE", details)
+
+    def test_files_are_returned_with_their_messages(self):
+        for index in range(3):
+            self.archive.add_message(chat_id="C1", message=SlackMessage.from_dict({
+                "ts": f"{index}.000000",
+                "user": "U1",
+                "text": f"message {index}",
+                "files": [{"id": f"F{index}", "name": f"file{index}.png", "url_private": "https://files/F"}]
+            }))
+        messages = self.archive.get_messages(chat_id="C1", limit=2)
+        self.assertEqual([message["ts"] for message in messages], ["2.000000", "1.000000"])
+        self.assertEqual([[file["id"] for file in message["files"]] for message in messages], [["F2"], ["F1"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+import zipfile
+
+from libraries.bundle import OutputBundle
+
+
+class BundleAbortTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.root_path = self.temporary_folder.name
+
+    def tearDown(self):
+        self.temporary_folder.cleanup()
+
+    def write_chat(self, bundle: OutputBundle, folder_name: str, text: str):
+        bundle.start_chat(folder_name=folder_name)
+        if not bundle.contains(path=f"{self.root_path}/assets/page.css"):
+            with bundle.open(path=f"{self.root_path}/assets/page.css") as f:
+                f.write("body {}")
+        with bundle.open(path=f"{self.root_path}/{folder_name}/index.html") as f:
+            f.write(text)
+
+    def get_bundle_names(self, file_name: str):
+        with zipfile.ZipFile(f"{self.root_path}/{file_name}") as f:
+            return {name: f.read(name).decode("utf-8") for name in f.namelist()}
+
+    def test_failed_chat_keeps_its_last_bundle(self):
+        bundle = OutputBundle(root_path=self.root_path, per_chat=True)
+        self.write_chat(bundle=bundle, folder_name="general", text="complete")
+        bundle.finish_chat()
+        self.write_chat(bundle=bundle, folder_name="general", text="partial")
+        bundle.abort_chat()
+        bundle.close()
+        self.assertEqual(self.get_bundle_names("general.zip")["general/index.html"], "complete")
+        self.assertFalse(os.path.exists(f"{self.root_path}/general.zip.part"))
+
+    def test_failed_chat_discards_the_run_bundle(self):
+        bundle = OutputBundle(root_path=self.root_path)
+        self.write_chat(bundle=bundle, folder_name="general", text="complete")
+        bundle.finish_chat()
+        bundle.close()
+        bundle = OutputBundle(root_path=self.root_path)
+        self.write_chat(bundle=bundle, folder_name="general", text="newer")
+        bundle.finish_chat()
+        self.write_chat(bundle=bundle, folder_name="random", text="partial")
+        bundle.abort_chat()
+        bundle.close()
+        self.assertEqual(self.get_bundle_names("Nana Slack.zip")["general/index.html"], "complete")
+        self.assertFalse(os.path.exists(f"{self.root_path}/Nana Slack.zip.part"))
+
+    def test_chat_failing_before_writing_keeps_the_run_bundle(self):
+        bundle = OutputBundle(root_path=self.root_path)
+        self.write_chat(bundle=bundle, folder_name="general", text="complete")
+        bundle.finish_chat()
+        bundle.start_chat(folder_name="random")
+        bundle.abort_chat()
+        bundle.close()
+        self.assertEqual(self.get_bundle_names("Nana Slack.zip")["general/index.html"], "complete")
+
+
+if __name__ == '__main__':
+    unittest.main()
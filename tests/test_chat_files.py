@@ -0,0 +1,40 @@
+import tempfile
+import unittest
+
+from libraries.exporter import ChatExporter
+
+
+class FakeWebClient:
+    # files.list fails with a network error after its first page
+    def conversations_history(self, channel: str, cursor: str = None, oldest: str = None, latest: str = None,
+                              inclusive: bool = False):
+        return {"messages": [
+            {"ts": f"170000000{index}.000000", "user": "U1", "text": f"message {index}", "files": [{
+                "id": f"F{index}", "name": f"file{index}.bin", "filetype": "bin",
+                "url_private": f"https://files/F{index}"
+            }]}
+            for index in range(2)
+        ], "has_more": False, "response_metadata": {"next_cursor": ""}}
+
+    def files_list(self, channel: str, count: int, page: int, **kwargs):
+        if page > 1:
+            raise ConnectionError("connection reset")
+        return {"files": [{"id": "F0", "name": "file0.bin", "filetype": "bin", "url_private": "https://files/F0"}],
+                "paging": {"pages": 2}}
+
+
+class ChatFilesTest(unittest.TestCase):
+    def test_failed_inventory_downloads_media_found_while_rendering(self):
+        exporter = ChatExporter(token="", users={"U1": {"name": "user", "real_name": "User"}},
+                                render_cache=False, thread_cache=False)
+        exporter.slack_client.client = FakeWebClient()
+        downloads = []
+        exporter.download_media_file = lambda file_name, **kwargs: downloads.append(file_name)
+        with tempfile.TemporaryDirectory() as save_path:
+            exporter.export_chat(chat_id="C1", chat_name="general", chat_type="Channel", save_path=save_path,
+                                 save_media=True)
+        self.assertEqual(sorted(downloads), ["file01.bin", "file11.bin"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import glob
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from slack_sdk.errors import SlackApiError
+
+from libraries.exporter import ChatExporter
+
+day_seconds = 24 * 60 * 60
+
+
+class FakeWebClient:
+    # conversations.history over one message per day, newest first, optionally failing on every call
+    def __init__(self, days: int, fail: bool = False, page_size: int = 3):
+        now = time.time()
+        self.messages = [
+            {"ts": f"{now - day_index * day_seconds:.6f}", "user": "U1", "text": f"message {day_index}"}
+            for day_index in range(days)
+        ]
+        self.fail = fail
+        self.page_size = page_size
+
+    def conversations_history(self, channel: str, cursor: str = None, oldest: str = None, latest: str = None,
+                              inclusive: bool = False):
+        if self.fail:
+            raise SlackApiError("ratelimited", {"ok": False, "error": "ratelimited"})
+        messages = [
+            message for message in self.messages
+            if (oldest is None or float(message["ts"]) > float(oldest))
+            and (latest is None or float(message["ts"]) < float(latest))
+        ]
+        start = int(cursor or 0)
+        page = messages[start:start + self.page_size]
+        has_more = start + self.page_size < len(messages)
+        return {
+            "messages": page,
+            "has_more": has_more,
+            "response_metadata": {"next_cursor": str(start + self.page_size) if has_more else ""}
+        }
+
+    def conversations_replies(self, **kwargs):
+        return {"messages": [], "has_more": False}
+
+
+class DaySyncTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.save_path = self.temporary_folder.name
+        self.days_path = f"{self.save_path}/Nana Slack - Channel - general/days"
+
+    def tearDown(self):
+        self.temporary_folder.cleanup()
+
+    def export(self, client: FakeWebClient):
+        exporter = ChatExporter(token="", users={"U1": {"name": "user", "real_name": "User"}},
+                                render_cache=False, thread_cache=False)
+        exporter.slack_client.client = client
+        exporter.export_chat(chat_id="C1", chat_name="general", chat_type="Channel", save_path=self.save_path,
+                             save_media=False, page_layout="days")
+
+    def get_stored_days(self):
+        with open(f"{self.days_path}/manifest.json", "r") as f:
+            manifest = json.load(f)
+        return sorted(file_name for file_name in os.listdir(self.days_path) if file_name != "manifest.json"), manifest
+
+    def test_failed_sync_keeps_stored_days(self):
+        self.export(client=FakeWebClient(days=10))
+        stored_days, manifest = self.get_stored_days()
+        self.assertEqual(len(stored_days), 10)
+        history_folders = set(glob.glob(f"{tempfile.gettempdir()}/slack-history-*"))
+        with self.assertRaises(SlackApiError):
+            self.export(client=FakeWebClient(days=10, fail=True))
+        self.assertEqual(self.get_stored_days(), (stored_days, manifest))
+        # the spool of the failed export is removed as well
+        self.assertEqual(set(glob.glob(f"{tempfile.gettempdir()}/slack-history-*")), history_folders)
+
+    def test_complete_sync_removes_deleted_days(self):
+        self.export(client=FakeWebClient(days=10))
+        client = FakeWebClient(days=10)
+        del client.messages[1]
+        self.export(client=client)
+        stored_days, _ = self.get_stored_days()
+        self.assertEqual(len(stored_days), 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
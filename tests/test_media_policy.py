@@ -0,0 +1,57 @@
+import tempfile
+import unittest
+
+from libraries.exporter import ChatExporter
+from libraries.media import MediaPolicy
+
+
+class FakeWebClient:
+    # one message with a file per hour, files.list finds none so every file is only found while rendering
+    def __init__(self, messages: int = 4, file_size: int = 1000, start: int = 0):
+        self.messages = [
+            {"ts": f"{1700000000 - index * 3600:.6f}", "user": "U1", "text": f"message {index}", "files": [{
+                "id": f"F{index}", "name": f"file{index}.bin", "filetype": "bin", "size": file_size,
+                "url_private": f"https://files/F{index}"
+            }]}
+            for index in range(start, messages)
+        ]
+
+    def conversations_history(self, channel: str, cursor: str = None, oldest: str = None, latest: str = None,
+                              inclusive: bool = False):
+        return {"messages": self.messages, "has_more": False, "response_metadata": {"next_cursor": ""}}
+
+    def conversations_replies(self, **kwargs):
+        return {"messages": [], "has_more": False}
+
+    def files_list(self, **kwargs):
+        return {"files": [], "paging": {"pages": 1}}
+
+
+class CachedMediaPolicyTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary_folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temporary_folder.cleanup()
+
+    def export(self, client: FakeWebClient):
+        exporter = ChatExporter(token="", users={"U1": {"name": "user", "real_name": "User"}},
+                                media_policy=MediaPolicy(chat_byte_budget=2500), thread_cache=False)
+        exporter.slack_client.client = client
+        downloads = []
+        exporter.download_media_file = lambda file_name, **kwargs: downloads.append(file_name)
+        exporter.export_chat(chat_id="C1", chat_name="general", chat_type="Channel",
+                             save_path=self.temporary_folder.name, save_media=True)
+        return sorted(downloads)
+
+    def test_warm_render_cache_keeps_the_byte_budget(self):
+        cold_downloads = self.export(client=FakeWebClient(messages=4, start=2))
+        self.assertEqual(len(cold_downloads), 2)
+        # the two older messages come from the render cache, the files they download count against the budget
+        # left for the two new ones
+        warm_downloads = self.export(client=FakeWebClient(messages=4))
+        self.assertEqual(warm_downloads, cold_downloads)
+
+
+if __name__ == '__main__':
+    unittest.main()
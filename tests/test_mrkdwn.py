@@ -0,0 +1,50 @@
+import unittest
+
+from libraries.mrkdwn import MrkdwnMarkdownRenderer, MrkdwnRenderer, MrkdwnTextRenderer, escape_html
+
+
+class LinkSchemeTest(unittest.TestCase):
+    def test_unsafe_schemes_are_not_linked(self):
+        for text in ("<javascript:alert(1)|click>", "<JavaScript:alert(1)>", "<data:text/html,x|click>",
+                     "<vbscript:x|click>"):
+            self.assertNotIn("<a ", MrkdwnRenderer().render(text))
+            self.assertNotIn("](", MrkdwnMarkdownRenderer().render(text))
+
+    def test_safe_schemes_are_linked(self):
+        self.assertEqual(MrkdwnRenderer().render_inline("<https://example.com|site>"),
+                         '<a href="https://example.com" target="_blank">site</a>')
+        self.assertEqual(MrkdwnRenderer().render_inline("<mailto:a@example.com>"),
+                         '<a href="mailto:a@example.com" target="_blank">mailto:a@example.com</a>')
+
+
+class LinkEntityTest(unittest.TestCase):
+    def test_text_links_are_unescaped(self):
+        self.assertEqual(MrkdwnTextRenderer().render("<https://example.com/?a=1&amp;b=2|Q&amp;A>"),
+                         "Q&A (https://example.com/?a=1&b=2)")
+        self.assertEqual(MrkdwnMarkdownRenderer().render("<https://example.com/?a=1&amp;b=&lt;2&gt;>"),
+                         "[https://example.com/?a=1&b=\\<2\\>](<https://example.com/?a=1&b=%3C2%3E>)")
+
+    def test_html_links_stay_escaped(self):
+        self.assertEqual(MrkdwnRenderer().render_inline("<https://example.com/?a=1&amp;b=2|site>"),
+                         '<a href="https://example.com/?a=1&amp;b=2" target="_blank">site</a>')
+
+
+class PlainTextTest(unittest.TestCase):
+    def test_escape_keeps_entities(self):
+        self.assertEqual(escape_html('a & b &amp; <c> "d" &#39; &x;'),
+                         "a &amp; b &amp; &lt;c&gt; &quot;d&quot; &#39; &amp;x;")
+
+    def test_quotes_open_only_at_line_start(self):
+        self.assertEqual(MrkdwnRenderer().render_inline("&gt; quoted *bold*\nx &gt; y\n&gt;next"),
+                         '<span class="quote">quoted <strong>bold</strong></span>x &gt; y<br>'
+                         '<span class="quote">next</span>')
+        self.assertEqual(MrkdwnTextRenderer().render("&gt; a &amp; b\nc &lt;d&gt;"), "> a & b\nc <d>")
+
+    def test_code_blocks_close_the_quote(self):
+        self.assertEqual(MrkdwnRenderer().render("&gt; quote ```a &lt; b``` after"),
+                         '<p><bdi><span class="quote">quote </span></bdi></p>'
+                         '<div class="code-block"><pre>a &lt; b</pre></div><p><bdi> after</bdi></p>')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import json
+import os
+import pstats
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from libraries.profiling import ExportProfiler
+
+
+def busy_worker(count: int):
+    return sum(index * index for index in range(count))
+
+
+class WorkerStageTest(unittest.TestCase):
+    def test_worker_threads_are_profiled(self):
+        profiler = ExportProfiler(enabled=True)
+
+        def run_worker(count: int):
+            with profiler.worker_stage("workers"):
+                return busy_worker(count)
+
+        with profiler.stage("waiting"):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list(executor.map(run_worker, [10000] * 8))
+        with tempfile.TemporaryDirectory() as folder_path:
+            profiler.dump(folder_path=folder_path)
+            with open(os.path.join(folder_path, "profile", "memory.json"), "r") as f:
+                summary = json.load(f)
+            self.assertEqual(summary["waiting"]["threads"], "calling")
+            self.assertEqual(summary["workers"]["threads"], "workers")
+            self.assertEqual(summary["workers"]["calls"], 8)
+            # the work itself shows up in the worker profile, not in the profile of the thread waiting for it
+            worker_functions = {function[2] for function in pstats.Stats(
+                os.path.join(folder_path, "profile", "workers.prof")
+            ).stats}
+            waiting_functions = {function[2] for function in pstats.Stats(
+                os.path.join(folder_path, "profile", "waiting.prof")
+            ).stats}
+            self.assertIn("busy_worker", worker_functions)
+            self.assertNotIn("busy_worker", waiting_functions)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from slack_sdk.errors import SlackApiError
+
+from libraries.slack import SlackClient
+
+
+class FakeWebClient:
+    # one message per hour between 0 and 100 hours, windows reaching below failing_before raise
+    def __init__(self, failing_before: float = None):
+        self.messages = [{"ts": f"{hour * 3600:.6f}", "text": f"message {hour}"} for hour in range(100, 0, -1)]
+        self.failing_before = failing_before
+
+    def conversations_history(self, channel: str, cursor: str = None, oldest: str = None, latest: str = None,
+                              inclusive: bool = False):
+        if self.failing_before is not None and float(oldest) < self.failing_before:
+            raise SlackApiError("ratelimited", {"ok": False, "error": "ratelimited"})
+        return {
+            "messages": [
+                message for message in self.messages if float(oldest) <= float(message["ts"]) <= float(latest)
+            ],
+            "has_more": False
+        }
+
+
+class ShardedHistoryTest(unittest.TestCase):
+    def fetch(self, client: FakeWebClient):
+        slack_client = SlackClient(token="")
+        slack_client.client = client
+        return [
+            message.ts
+            for _, page in slack_client.iter_sharded_chat_history_pages(
+                chat_id="C1", chat_name="general", oldest=f"{0:.6f}", latest=f"{101 * 3600:.6f}", shard_count=4,
+                max_workers=2
+            )
+            for message in page
+        ]
+
+    def test_all_shards(self):
+        self.assertEqual(len(self.fetch(client=FakeWebClient())), 100)
+
+    def test_failed_shard_is_raised(self):
+        with self.assertRaises(SlackApiError):
+            self.fetch(client=FakeWebClient(failing_before=30 * 3600))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import glob
+import os
+import tempfile
+import unittest
+
+from libraries.exporter import ChatExporter, text_formats
+from libraries.media import MediaPolicy
+
+
+class FakeWebClient:
+    # one message with a file the media policy skips, so its link points at slack
+    def conversations_history(self, channel: str, cursor: str = None, oldest: str = None, latest: str = None,
+                              inclusive: bool = False):
+        return {"messages": [{"ts": "1700000000.000000", "user": "U1", "text": "see <https://example.com/?a=1&amp;b=2>",
+                              "files": [{"id": "F1", "name": "big.bin", "filetype": "bin", "size": 1000,
+                                         "url_private": "https://files.slack.com/F1?t=1&v=2"}]}],
+                "has_more": False, "response_metadata": {"next_cursor": ""}}
+
+    def files_list(self, **kwargs):
+        return {"files": [], "paging": {"pages": 1}}
+
+
+class TextExportTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary_folder = tempfile.TemporaryDirectory()
+        self.save_path = self.temporary_folder.name
+
+    def tearDown(self):
+        self.temporary_folder.cleanup()
+
+    def export(self, output_format: str):
+        exporter = ChatExporter(token="", users={"U1": {"name": "user", "real_name": "User"}},
+                                media_policy=MediaPolicy(max_file_size=10), output_format=output_format)
+        exporter.slack_client.client = FakeWebClient()
+        exporter.export_chat(chat_id="C1", chat_name="general", chat_type="Channel", save_path=self.save_path,
+                             save_media=True)
+        output_paths = glob.glob(f"{self.save_path}/*/*.{text_formats[output_format]['extension']}")
+        with open(output_paths[0], "r", encoding="utf-8") as f:
+            return f.read()
+
+    def test_text_urls_are_not_html_escaped(self):
+        for output_format in ("text", "markdown"):
+            output = self.export(output_format=output_format)
+            self.assertIn("https://files.slack.com/F1?t=1&v=2", output)
+            self.assertIn("https://example.com/?a=1&b=2", output)
+            self.assertNotIn("&amp;", output)
+
+    def test_text_exports_have_no_page_assets(self):
+        self.export(output_format="text")
+        self.assertFalse(os.path.exists(f"{self.save_path}/assets"))
+
+
+if __name__ == '__main__':
+    unittest.main()